@@ -0,0 +1,165 @@
+import numpy as np
+
+from match_store import normalize_rows, top_n, BLOCK
+
+
+# --------------------------------------------------------
+# Global matching modes
+#
+# Top-k matching lets one popular NWS product be the best match for
+# dozens of SKUs. These helpers work on a sparse candidate graph (each
+# SKU's top-k edges, never a dense N×M matrix) and offer:
+#   - one-to-one assignment: greedy, or Hungarian per connected block
+#   - mutual nearest neighbours: SKU and competitor are each other's best
+# --------------------------------------------------------
+MAX_HUNGARIAN_BLOCK = 2000      # larger connected blocks fall back to greedy
+# Edges per SKU in the assignment graph. With the store's full depth the
+# catalog is one connected block (one dense Hungarian problem); fewer
+# edges, or a min similarity, split it into blocks that stay small.
+CANDIDATES = 3
+
+
+# --------------------------------------------------------
+# Candidate graph: (rows, cols, sims) edge arrays
+# --------------------------------------------------------
+def candidate_graph(tomko_vecs, nws_vecs, k=10):
+    """Top-k edges per SKU, computed block by block."""
+    T, N = normalize_rows(tomko_vecs), normalize_rows(nws_vecs)
+    rows, cols, sims = [], [], []
+    for start in range(0, len(T), BLOCK):
+        block = T[start:start + BLOCK] @ N.T
+        best = top_n(block, k)
+        rows.append(np.repeat(np.arange(start, start + len(block)), best.shape[1]))
+        cols.append(best.ravel())
+        sims.append(np.take_along_axis(block, best, axis=1).ravel())
+    if not rows:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0, dtype=np.float32)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(sims)
+
+
+def graph_from_store(store, tomko_keys, nws_keys, k=None, min_similarity=None):
+    """
+    Candidate graph from MatchStore heaps (already top-depth per SKU):
+    each SKU's best k edges, dropping any below min_similarity.
+    """
+    # duplicate keys map to their first row, as in MatchStore
+    t_pos, n_pos = {}, {}
+    for i, key in enumerate(tomko_keys):
+        t_pos.setdefault(key, i)
+    for i, key in enumerate(nws_keys):
+        n_pos.setdefault(key, i)
+    edges = [(t_pos[t], n_pos[n], sim)
+             for t, heap in store.matches.items() if t in t_pos
+             for sim, n in heap[:k]
+             if n in n_pos and (min_similarity is None or sim >= min_similarity)]
+    if not edges:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0, dtype=np.float32)
+    rows, cols, sims = zip(*edges)
+    return np.array(rows), np.array(cols), np.array(sims, dtype=np.float32)
+
+
+# --------------------------------------------------------
+# One-to-one assignment
+# --------------------------------------------------------
+def greedy_assignment(rows, cols, sims, min_similarity=None):
+    """
+    Take edges from most to least similar, skipping any whose SKU or
+    competitor is already used. {row: (col, sim)}
+    """
+    taken_rows, taken_cols, out = set(), set(), {}
+    for e in np.argsort(-sims, kind="stable"):
+        r, c, s = int(rows[e]), int(cols[e]), float(sims[e])
+        if min_similarity is not None and s < min_similarity:
+            break
+        if r in taken_rows or c in taken_cols:
+            continue
+        taken_rows.add(r)
+        taken_cols.add(c)
+        out[r] = (c, s)
+    return out
+
+
+def connected_blocks(rows, cols):
+    """Edge indices grouped by connected component of the bipartite graph."""
+    # union-find over SKU nodes r and competitor nodes ("c", c)
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for r, c in zip(rows.tolist(), cols.tolist()):
+        a, b = find(("r", r)), find(("c", c))
+        if a != b:
+            parent[a] = b
+
+    blocks = {}
+    for e, r in enumerate(rows.tolist()):
+        blocks.setdefault(find(("r", r)), []).append(e)
+    return [np.array(b) for b in blocks.values()]
+
+
+def hungarian_assignment(rows, cols, sims, min_similarity=None,
+                         max_block=MAX_HUNGARIAN_BLOCK):
+    """
+    Optimal one-to-one assignment (max total similarity) solved separately
+    on each connected block of the candidate graph. Blocks larger than
+    max_block, or everything if scipy is missing, use the greedy solver
+    (with a warning).
+    """
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        print("⚠️ scipy not installed; using greedy assignment (pip install scipy)")
+        return greedy_assignment(rows, cols, sims, min_similarity)
+
+    if min_similarity is not None:
+        keep = sims >= min_similarity
+        rows, cols, sims = rows[keep], cols[keep], sims[keep]
+
+    out = {}
+    for block in connected_blocks(rows, cols):
+        r_ids, r_local = np.unique(rows[block], return_inverse=True)
+        c_ids, c_local = np.unique(cols[block], return_inverse=True)
+        if max(len(r_ids), len(c_ids)) > max_block:
+            print(f"⚠️ {len(r_ids)}×{len(c_ids)} block exceeds max_block={max_block}; "
+                  f"using greedy assignment for it")
+            out.update(greedy_assignment(rows[block], cols[block], sims[block]))
+            continue
+
+        # non-edges get a cost no real edge can beat, then are dropped
+        cost = np.full((len(r_ids), len(c_ids)), 1e6, dtype=np.float64)
+        cost[r_local, c_local] = -sims[block]
+        for i, j in zip(*linear_sum_assignment(cost)):
+            if cost[i, j] < 1e6:
+                out[int(r_ids[i])] = (int(c_ids[j]), float(-cost[i, j]))
+    return out
+
+
+# --------------------------------------------------------
+# Mutual nearest neighbours
+# --------------------------------------------------------
+def reverse_best(tomko_vecs, nws_vecs):
+    """Best SKU row for every competitor (blockwise, exact)."""
+    T, N = normalize_rows(tomko_vecs), normalize_rows(nws_vecs)
+    best = np.empty(len(N), dtype=int)
+    for start in range(0, len(N), BLOCK):
+        best[start:start + BLOCK] = np.argmax(N[start:start + BLOCK] @ T.T, axis=1)
+    return best
+
+
+def mutual_best(rows, cols, sims, competitor_best):
+    """
+    SKU ↔ competitor pairs that are each other's nearest neighbour.
+    competitor_best: reverse_best() output. {row: (col, sim)}
+    """
+    out = {}
+    for e in np.argsort(-sims, kind="stable"):
+        r, c = int(rows[e]), int(cols[e])
+        if r in out:
+            continue        # only the SKU's own best edge counts
+        out[r] = (c, float(sims[e]))
+    return {r: (c, s) for r, (c, s) in out.items() if competitor_best[c] == r}
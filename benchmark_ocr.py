@@ -0,0 +1,101 @@
+import glob
+import json
+import os
+import time
+
+import brand_enrichment as be
+from ocr_preprocess import preprocess_for_ocr
+
+
+# --------------------------------------------------------
+# OCR benchmark: full-resolution vs preprocessed images
+#
+#   python benchmark_ocr.py [images/*.png] [repeat]
+#
+# Reports OCR time per image, how much of the baseline's text each
+# variant still reads, and how often it finds the same brand as the
+# full-resolution baseline (and the enriched label, when the product's
+# manufacturer is known). "full-res" with and without cls separates the
+# cost of the orientation classifier from the effect of preprocessing.
+# --------------------------------------------------------
+ENRICHED_JSON = "data/enriched_products.json"
+
+
+def reference_brands():
+    """ImagePath → known manufacturer from the last enrichment run."""
+    if not os.path.exists(ENRICHED_JSON):
+        return {}
+    with open(ENRICHED_JSON, "r") as f:
+        rows = json.load(f)
+    return {
+        r["ImagePath"]: r["Manufacturer"] for r in rows
+        if r.get("ImagePath") and r.get("Manufacturer") not in (None, "Unknown")
+    }
+
+
+def ocr_words(result):
+    return {w for line in (result[0] or []) for w in line[1][0].upper().split()}
+
+
+def run_variant(paths, prepare, cls, repeat=1):
+    brands, words, prep_s, ocr_s = [], [], 0.0, 0.0
+    for path in paths:
+        t0 = time.perf_counter()
+        target = prepare(path)
+        t1 = time.perf_counter()
+        try:
+            for _ in range(repeat):
+                result = be.get_ocr().ocr(target, cls=cls)
+            brand = be.brand_from_ocr(result)[0]
+        except Exception:
+            result, brand = [None], None
+        t2 = time.perf_counter()
+        prep_s += t1 - t0
+        ocr_s += (t2 - t1) / repeat
+        brands.append(brand)
+        words.append(ocr_words(result))
+    return brands, words, prep_s, ocr_s
+
+
+def main(pattern="images/*.png", repeat=1):
+    paths = sorted(glob.glob(pattern))
+    if not paths:
+        print(f"No images match {pattern}")
+        return
+
+    reference = reference_brands()
+    be.get_ocr()    # load the models before timing anything
+    variants = [
+        ("full-res + cls", lambda p: p, True),
+        ("full-res", lambda p: p, False),
+        ("preprocessed + cls", lambda p: preprocess_for_ocr(p), True),
+        ("preprocessed + crop", lambda p: preprocess_for_ocr(p, crop=True), True),
+    ]
+
+    print(f"Benchmarking OCR on {len(paths)} images\n")
+    print(f"{'variant':<22}{'prep ms/img':>12}{'ocr ms/img':>12}{'speedup':>9}"
+          f"{'words kept':>12}{'same brand':>12}{'vs label':>10}")
+
+    baseline, base_words, base_ocr = None, None, None
+    for name, prepare, cls in variants:
+        brands, words, prep_s, ocr_s = run_variant(paths, prepare, cls, repeat)
+        if baseline is None:
+            baseline, base_words, base_ocr = brands, words, ocr_s
+
+        same = sum(a == b for a, b in zip(brands, baseline))
+        kept = sum(len(w & b) for w, b in zip(words, base_words))
+        total = sum(len(b) for b in base_words)
+        labelled = [(b, reference[p]) for p, b in zip(paths, brands) if p in reference]
+        correct = sum(b == ref for b, ref in labelled)
+        label_txt = f"{correct}/{len(labelled)}" if labelled else "-"
+
+        print(f"{name:<22}{prep_s / len(paths) * 1000:>12.1f}{ocr_s / len(paths) * 1000:>12.1f}"
+              f"{base_ocr / ocr_s if ocr_s else 0:>8.2f}x"
+              f"{kept:>8}/{total:<3}{same:>8}/{len(paths):<3}{label_txt:>10}")
+
+    print("\nPreprocessing is cached in data/ocr_cache/, so its cost is paid once per image.")
+
+
+if __name__ == "__main__":
+    import sys
+    main(*sys.argv[1:2], *map(int, sys.argv[2:3]))
@@ -1,18 +1,32 @@
-import pandas as pd
 import json
 import re
 import os
 from difflib import get_close_matches
-from paddleocr import PaddleOCR
 
 
 # --------------------------------------------------------
 # Initialize OCR (used only as final fallback)
+# Built on first use: loading the PaddleOCR models takes seconds and
+# most products never reach the OCR step.
 # --------------------------------------------------------
-ocr = PaddleOCR(
-    lang='en',
-    use_textline_orientation=True
-)
+_ocr = None
+
+
+def get_ocr():
+    global _ocr
+    if _ocr is None:
+        from paddleocr import PaddleOCR
+        _ocr = PaddleOCR(
+            lang='en',
+            use_textline_orientation=True
+        )
+    return _ocr
+
+# Run OCR on a 320px grayscale copy (cached in data/ocr_cache/).
+# benchmark_ocr.py on images/: 1.85x faster, same text and brands as
+# full resolution. Cropping to the text region was slower (1.21x).
+PREPROCESS_OCR = True
+CROP_TEXT_REGION = False
 
 
 # --------------------------------------------------------
@@ -127,16 +141,44 @@ def fuzzy_brand(prefix):
 # --------------------------------------------------------
 # OCR fallback — look for manufacturer in image text
 # --------------------------------------------------------
+# Duplicate images (same picture, different product) share one OCR run
+_image_index = None
+_ocr_cache = {}
+
+
+def get_image_index():
+    global _image_index
+    if _image_index is None:
+        from image_index import ImageIndex
+        _image_index = ImageIndex.load()
+    return _image_index
+
+
 def ocr_brand(image_path):
     if not image_path or not os.path.exists(image_path):
         return None, None, None
+    key = get_image_index().canonical_path(image_path)
+    if key not in _ocr_cache:
+        _ocr_cache[key] = _ocr_brand(image_path)
+    return _ocr_cache[key]
+
+
+def brand_from_ocr(result):
+    text = " ".join([line[1][0] for line in result[0]])
+    text_upper = text.upper()
+    for brand in VERIFIED_BRANDS + SECONDARY_BRANDS:
+        if brand.upper() in text_upper:
+            return brand, "low", "ocr"
+    return None, None, None
+
+
+def _ocr_brand(image_path):
     try:
-        result = ocr.ocr(image_path, cls=True)
-        text = " ".join([line[1][0] for line in result[0]])
-        text_upper = text.upper()
-        for brand in VERIFIED_BRANDS + SECONDARY_BRANDS:
-            if brand.upper() in text_upper:
-                return brand, "low", "ocr"
+        if PREPROCESS_OCR:
+            from ocr_preprocess import preprocess_for_ocr
+            small = preprocess_for_ocr(image_path, crop=CROP_TEXT_REGION)
+            return brand_from_ocr(get_ocr().ocr(small, cls=True))
+        return brand_from_ocr(get_ocr().ocr(image_path, cls=True))
     except:
         pass
     return None, None, None
@@ -222,7 +264,13 @@ def save_enriched(df):
 # --------------------------------------------------------
 # Main execution
 # --------------------------------------------------------
-if __name__ == "__main__":
+def main():
+    import pandas as pd
+
     df = pd.read_csv("data/tomko_products.csv")
     enriched = enrich_manufacturers(df)
     save_enriched(enriched)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import os
+import subprocess
+import sys
+
+
+# --------------------------------------------------------
+# Single entry point for the pipeline
+#
+#   python cli.py scrape-tomko | scrape-nws | enrich | embed | match | serve
+#   python cli.py check-startup
+#
+# Each subcommand imports only the module it runs, so e.g. `match` never
+# loads playwright, selenium or PaddleOCR.
+# --------------------------------------------------------
+
+# Modules that take hundreds of ms (or seconds) to import. None of them
+# may be loaded by `import cli` or by importing a pipeline module.
+HEAVY_MODULES = ("playwright", "selenium", "paddleocr", "openai",
+                 "pandas", "openpyxl", "PIL", "requests")
+PIPELINE_MODULES = ("tomko_scraper", "nws_pipeline", "brand_enrichment",
+                    "create_embeddings", "create_nws_embeddings", "match_products")
+STARTUP_BUDGET_MS = 50      # `import cli` only
+MODULE_BUDGET_MS = 400      # a pipeline module (numpy allowed)
+
+MATCH_MODES = ("topk", "assign", "mutual")
+SOLVERS = ("hungarian", "greedy")
+
+
+def cmd_scrape_tomko(args):
+    import asyncio
+    import tomko_scraper
+    asyncio.run(tomko_scraper.main())
+
+
+def cmd_scrape_nws(args):
+    import nws_pipeline
+    nws_pipeline.main()
+
+
+def cmd_enrich(args):
+    import brand_enrichment
+    brand_enrichment.main()
+
+
+def cmd_embed(args):
+    if args.only in (None, "tomko"):
+        import create_embeddings
+        create_embeddings.main()
+    if args.only in (None, "nws"):
+        import create_nws_embeddings
+        create_nws_embeddings.main()
+
+
+def cmd_match(args):
+    import match_products
+    match_products.main(args.mode, args.solver, args.candidates, args.min_similarity)
+
+
+def cmd_serve(args):
+    import match_service
+    match_service.main(args.service_args)
+
+
+# --------------------------------------------------------
+# Startup guard: measures imports in a fresh interpreter
+# --------------------------------------------------------
+_PROBE = """
+import sys, time
+t = time.perf_counter()
+import {module}
+ms = (time.perf_counter() - t) * 1000
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(f"{{ms:.1f}} {{','.join(heavy)}}")
+"""
+
+
+def probe_import(module):
+    """(import ms, heavy modules loaded) for module in a clean interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proc.returncode != 0:
+        # e.g. a top-level import of a dependency that isn't installed
+        return float("inf"), [proc.stderr.strip().splitlines()[-1]]
+    out = proc.stdout.split()
+    return float(out[0]), out[1].split(",") if len(out) > 1 else []
+
+
+def cmd_check_startup(args):
+    failures = []
+    for module, budget in [("cli", STARTUP_BUDGET_MS)] + [(m, MODULE_BUDGET_MS) for m in PIPELINE_MODULES]:
+        # best of a few runs, so a cold disk cache doesn't fail the check
+        ms, heavy = min(probe_import(module) for _ in range(args.runs))
+        ok = ms <= budget and not heavy
+        print(f"{'✓' if ok else '✗'} import {module:<22}{ms:>8.1f} ms (budget {budget} ms)"
+              + (f"  loads {', '.join(heavy)}" if heavy else ""))
+        if not ok:
+            failures.append(module)
+
+    if failures:
+        print(f"\n❌ Startup budget exceeded: {', '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ Startup within budget")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Tomko ↔ NWS pipeline")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("scrape-tomko", help="scrape tomkosports.com").set_defaults(func=cmd_scrape_tomko)
+    sub.add_parser("scrape-nws", help="scrape networldsports.com").set_defaults(func=cmd_scrape_nws)
+    sub.add_parser("enrich", help="add manufacturer/brand to Tomko products").set_defaults(func=cmd_enrich)
+
+    embed = sub.add_parser("embed", help="create Tomko and NWS embeddings")
+    embed.add_argument("--only", choices=["tomko", "nws"])
+    embed.set_defaults(func=cmd_embed)
+
+    match = sub.add_parser("match", help="match Tomko SKUs to NWS products")
+    match.add_argument("--mode", choices=MATCH_MODES, default="topk",
+                       help="topk per SKU, one-to-one assignment, or mutual best matches")
+    match.add_argument("--solver", choices=SOLVERS, default="hungarian",
+                       help="solver for --mode assign")
+    match.add_argument("--candidates", type=int,
+                       help="edges per SKU for assign/mutual (default assignment.CANDIDATES); "
+                            "fewer edges mean smaller Hungarian blocks")
+    match.add_argument("--min-similarity", type=float,
+                       help="drop assign/mutual candidates below this similarity")
+    match.set_defaults(func=cmd_match)
+
+    serve = sub.add_parser("serve", help="run the local match service")
+    serve.add_argument("service_args", nargs=argparse.REMAINDER,
+                       help="passed through to match_service.py (e.g. --port 8765)")
+    serve.set_defaults(func=cmd_serve)
+
+    check = sub.add_parser("check-startup", help="fail if imports exceed the startup budget")
+    check.add_argument("--runs", type=int, default=3)
+    check.set_defaults(func=cmd_check_startup)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
 import json
 import numpy as np
-from openai import OpenAI
 
-client = OpenAI()
+from fetch_governor import embed_cached, LEDGER_FILE
+
+MODEL = "text-embedding-3-small"
+# vectors of every product text embedded so far, so a rerun only embeds
+# new/changed products and the ones that failed last time
+CACHE_FILE = "data/tomko_embedding_cache.npz"
+
 
 def build_tomko_text(product):
     name = product.get("ProductName", "")
@@ -25,30 +30,31 @@ def build_tomko_text(product):
 
     return text.strip()
 
-def create_tomko_embeddings(input_json_path, output_npy_path):
+def create_tomko_embeddings(input_json_path, output_npy_path, cache_path=CACHE_FILE):
     with open(input_json_path, "r") as f:
         data = json.load(f)
 
-    embeddings = []
-    for idx, product in enumerate(data):
-        text = build_tomko_text(product)
-
-        print(f"Embedding Tomko product {idx+1}/{len(data)}: {product.get('ProductName')}")
-
-        emb = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        ).data[0].embedding
+    texts = [build_tomko_text(product) for product in data]
+    keys = [product.get("ProductURL") for product in data]
+    embeddings, failed = embed_cached(texts, keys, MODEL, cache_path, label="Tomko product")
 
-        embeddings.append(emb)
+    if failed:
+        # rows must line up with the product file, so don't write a partial array
+        print(f"⚠️ {len(failed)} Tomko products failed (see {LEDGER_FILE}); "
+              f"rerun to retry them. {output_npy_path} not updated.")
+        return
 
     embeddings = np.array(embeddings)
     np.save(output_npy_path, embeddings)
     print(f"Saved Tomko embeddings → {output_npy_path} with shape {embeddings.shape}")
 
 
-if __name__ == "__main__":
+def main():
     create_tomko_embeddings(
         input_json_path="data/tomko_products.json",
         output_npy_path="data/tomko_embeddings.npy"
     )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,23 @@
 import json
 import numpy as np
-from openai import OpenAI
 
-client = OpenAI()
+from fetch_governor import embed_cached, LEDGER_FILE
+from dedupe import load_canonical, CANONICAL_FILE
+
+MODEL = "text-embedding-3-large"
+# vectors of every product text embedded so far, so a rerun only embeds
+# new/changed products and the ones that failed last time
+CACHE_FILE = "data/nws_embedding_cache.npz"
+
 
 def build_nws_text(product):
     name = product.get("name", "")
-    category = product.get("cat", "")
-    subcategory = product.get("subcat", "")
+    # canonical products carry every category they are listed under
+    memberships = product.get("categories") or [
+        {"cat": product.get("cat", ""), "subcat": product.get("subcat", "")}
+    ]
+    category = "; ".join(dict.fromkeys(m["cat"] for m in memberships))
+    subcategory = "; ".join(dict.fromkeys(m["subcat"] for m in memberships))
     price = product.get("price", "")
     description = product.get("description", "")  # may not exist but safe
 
@@ -21,30 +31,33 @@ def build_nws_text(product):
 
     return text.strip()
 
-def create_nws_embeddings(input_json_path, output_npy_path):
+def create_nws_embeddings(input_json_path, output_npy_path, cache_path=CACHE_FILE):
     with open(input_json_path, "r") as f:
         data = json.load(f)
 
-    embeddings = []
-    for idx, product in enumerate(data):
-        text = build_nws_text(product)
-
-        print(f"Embedding NWS product {idx+1}/{len(data)}: {product.get('name')}")
-
-        emb = client.embeddings.create(
-            model="text-embedding-3-large",
-            input=text
-        ).data[0].embedding
+    texts = [build_nws_text(product) for product in data]
+    keys = [product.get("url") for product in data]
+    embeddings, failed = embed_cached(texts, keys, MODEL, cache_path, label="NWS product")
 
-        embeddings.append(emb)
+    if failed:
+        # rows must line up with the product file, so don't write a partial array
+        print(f"⚠️ {len(failed)} NWS products failed (see {LEDGER_FILE}); "
+              f"rerun to retry them. {output_npy_path} not updated.")
+        return
 
     embeddings = np.array(embeddings)
     np.save(output_npy_path, embeddings)
     print(f"Saved NWS embeddings → {output_npy_path} with shape {embeddings.shape}")
 
 
-if __name__ == "__main__":
+def main():
+    # only canonical (deduplicated) products are embedded
+    load_canonical()
     create_nws_embeddings(
-        input_json_path="data/nws_products.json",
+        input_json_path=CANONICAL_FILE,
         output_npy_path="data/nws_embeddings.npy"
     )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from urllib.parse import urlparse
+
+
+# --------------------------------------------------------
+# Canonical product deduplication
+#
+# NWS lists the same product under several subcategories, so the raw
+# scrape repeats it. Products are merged when they share a canonical URL
+# or a normalized name; each canonical product keeps every
+# (category, subcategory) it appeared under.
+# --------------------------------------------------------
+RAW_FILE = "data/nws_products.json"
+CANONICAL_FILE = "data/nws_products_canonical.json"
+
+
+def canonical_url(url):
+    """Drop scheme, query, fragment, www. and trailing slash; lowercase host."""
+    if not url:
+        return ""
+    parts = urlparse(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host + parts.path.rstrip("/")
+
+
+def normalize_name(name):
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKC", name).lower()
+    text = text.replace("’", "'").replace("'", "")
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return " ".join(text.split())
+
+
+def name_hash(name):
+    norm = normalize_name(name)
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()[:16] if norm else ""
+
+
+def canonical_id(url):
+    return hashlib.sha1(canonical_url(url).encode("utf-8")).hexdigest()[:12]
+
+
+# --------------------------------------------------------
+# Merge duplicates
+# --------------------------------------------------------
+def dedupe_products(products):
+    """
+    Returns one record per canonical product (first occurrence wins),
+    with "canonical_id", "categories" and "alias_urls" added.
+    """
+    parent = list(range(len(products)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # union rows sharing a canonical URL or a normalized-name hash
+    first_by_key = {}
+    for i, p in enumerate(products):
+        for key in (("url", canonical_url(p.get("url"))), ("name", name_hash(p.get("name")))):
+            if not key[1]:
+                continue
+            if key in first_by_key:
+                a, b = find(first_by_key[key]), find(i)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+            else:
+                first_by_key[key] = i
+
+    groups = {}
+    for i in range(len(products)):
+        groups.setdefault(find(i), []).append(i)
+
+    canonical = []
+    for root in sorted(groups):
+        members = [products[i] for i in groups[root]]
+        record = dict(members[0])
+        record["canonical_id"] = canonical_id(record.get("url"))
+
+        categories, urls = [], []
+        for m in members:
+            membership = {"cat": m.get("cat", ""), "subcat": m.get("subcat", "")}
+            if membership not in categories:
+                categories.append(membership)
+            if m.get("url") and m["url"] != record.get("url") and m["url"] not in urls:
+                urls.append(m["url"])
+        record["categories"] = categories
+        record["alias_urls"] = urls
+        canonical.append(record)
+
+    return canonical
+
+
+# --------------------------------------------------------
+# Load / save
+# --------------------------------------------------------
+def save_canonical(canonical, path=CANONICAL_FILE):
+    with open(path, "w") as f:
+        json.dump(canonical, f, indent=2)
+
+
+def load_canonical(path=CANONICAL_FILE, raw_path=RAW_FILE):
+    """Canonical products; rebuilt from the raw scrape if missing or older."""
+    if os.path.exists(path) and (
+        not os.path.exists(raw_path) or os.path.getmtime(path) >= os.path.getmtime(raw_path)
+    ):
+        with open(path, "r") as f:
+            return json.load(f)
+    with open(raw_path, "r") as f:
+        canonical = dedupe_products(json.load(f))
+    save_canonical(canonical, path)
+    return canonical
+
+
+if __name__ == "__main__":
+    with open(RAW_FILE, "r") as f:
+        raw = json.load(f)
+    canonical = dedupe_products(raw)
+    save_canonical(canonical)
+    print(f"{len(raw)} raw → {len(canonical)} canonical products")
+    print(f"Saved to: {CANONICAL_FILE}")
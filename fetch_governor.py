@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+
+# --------------------------------------------------------
+# Defaults (per host, adjusted at runtime)
+# --------------------------------------------------------
+DEFAULT_RATE = 2.0           # requests per second
+DEFAULT_BURST = 4            # token bucket capacity
+MIN_RATE = 0.2
+MAX_RATE = 20.0
+DEFAULT_CONCURRENCY = 2
+MAX_CONCURRENCY = 8
+
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 1.0           # seconds
+BACKOFF_CAP = 60.0
+
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+LEDGER_FILE = "data/failed_fetches.json"
+EMBEDDINGS_URL = "https://api.openai.com/v1/embeddings"
+
+
+class RetryableStatus(Exception):
+    """Raised when a fetch came back with a throttling / server error status."""
+
+    def __init__(self, status, url=""):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+
+
+# --------------------------------------------------------
+# Classify a result / exception
+# --------------------------------------------------------
+def status_of(obj):
+    """HTTP status of a requests/playwright response or API exception, else None."""
+    for attr in ("status_code", "status"):
+        value = getattr(obj, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_timeout(exc):
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)):
+        return True
+    # requests.Timeout, playwright TimeoutError, selenium TimeoutException,
+    # openai APITimeoutError all carry "Timeout" in the class name
+    return "Timeout" in type(exc).__name__
+
+
+def is_throttle(exc):
+    """429 / 5xx / timeouts mean the host wants us to slow down."""
+    if isinstance(exc, RetryableStatus):
+        return True
+    if is_timeout(exc):
+        return True
+    return status_of(exc) in RETRY_STATUSES
+
+
+def host_of(url):
+    return urlparse(url).netloc.lower() or url
+
+
+# --------------------------------------------------------
+# Per-host state: token bucket + AIMD concurrency window
+# --------------------------------------------------------
+class HostState:
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 concurrency=DEFAULT_CONCURRENCY):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.limit = float(concurrency)
+        self.in_flight = 0
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def on_success(self):
+        # additive increase: roughly +1 slot per window of successes
+        self.limit = min(MAX_CONCURRENCY, self.limit + 1.0 / max(self.limit, 1.0))
+        self.rate = min(MAX_RATE, self.rate + 0.1)
+
+    def on_throttle(self):
+        # multiplicative decrease
+        self.limit = max(1.0, self.limit / 2)
+        self.rate = max(MIN_RATE, self.rate / 2)
+        self.tokens = min(self.tokens, 0.0)
+
+
+# --------------------------------------------------------
+# Governor shared by scrapers and the embedding client
+# --------------------------------------------------------
+class FetchGovernor:
+    def __init__(self, host_config=None, max_attempts=MAX_ATTEMPTS,
+                 ledger_file=LEDGER_FILE):
+        self.host_config = host_config or {}
+        self.max_attempts = max_attempts
+        self.ledger_file = ledger_file
+        self.ledger = []
+        self._resolved = set()      # keys that succeeded this run
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = HostState(**self.host_config.get(host, {}))
+        return self._hosts[host]
+
+    def _try_acquire(self, host):
+        """Take a slot + token for host. Returns 0 on success, else seconds to wait."""
+        with self._lock:
+            st = self._state(host)
+            st.refill(time.monotonic())
+            if st.in_flight >= int(st.limit):
+                return 0.05
+            if st.tokens < 1.0:
+                return (1.0 - st.tokens) / st.rate
+            st.tokens -= 1.0
+            st.in_flight += 1
+            return 0
+
+    def _release(self, host, exc=None):
+        with self._lock:
+            st = self._state(host)
+            st.in_flight -= 1
+            if exc is None:
+                st.on_success()
+            elif is_throttle(exc):
+                st.on_throttle()
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+    def _check(self, result, url):
+        status = status_of(result)
+        if status in RETRY_STATUSES:
+            raise RetryableStatus(status, url)
+        return result
+
+    def _resolve(self, url, key):
+        with self._lock:
+            self._resolved.add(key or url)
+
+    def _record(self, url, key, exc, attempts):
+        with self._lock:
+            self.ledger.append({
+                "url": url,
+                "key": key or url,
+                "host": host_of(url),
+                "error": f"{type(exc).__name__}: {exc}"[:300],
+                "attempts": attempts,
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            })
+
+    # ----------------------------------------------------
+    # Blocking calls (requests, selenium, openai)
+    # ----------------------------------------------------
+    def call(self, url, fn, *args, key=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) under the limits for url's host.
+        Retries throttling errors with backoff; after the last attempt the
+        failure goes to the ledger under key (default: url) and the
+        exception is re-raised.
+        """
+        host = host_of(url)
+        for attempt in range(self.max_attempts):
+            while True:
+                wait = self._try_acquire(host)
+                if not wait:
+                    break
+                time.sleep(wait)
+            try:
+                result = self._check(fn(*args, **kwargs), url)
+            except Exception as exc:
+                self._release(host, exc)
+                if not is_throttle(exc) or attempt == self.max_attempts - 1:
+                    self._record(url, key, exc, attempt + 1)
+                    raise
+                time.sleep(self.backoff(attempt))
+                continue
+            self._release(host)
+            self._resolve(url, key)
+            return result
+
+    # ----------------------------------------------------
+    # Async calls (playwright)
+    # ----------------------------------------------------
+    async def acall(self, url, fn, *args, key=None, **kwargs):
+        """Same as call() but for coroutine functions."""
+        host = host_of(url)
+        for attempt in range(self.max_attempts):
+            while True:
+                wait = self._try_acquire(host)
+                if not wait:
+                    break
+                await asyncio.sleep(wait)
+            try:
+                result = self._check(await fn(*args, **kwargs), url)
+            except Exception as exc:
+                self._release(host, exc)
+                if not is_throttle(exc) or attempt == self.max_attempts - 1:
+                    self._record(url, key, exc, attempt + 1)
+                    raise
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            self._release(host)
+            self._resolve(url, key)
+            return result
+
+    # ----------------------------------------------------
+    # Failure ledger
+    # ----------------------------------------------------
+    def save_ledger(self):
+        """Append this run's failures; drop older entries that have since succeeded."""
+        with self._lock:
+            failed, resolved = self.ledger, self._resolved
+            self.ledger, self._resolved = [], set()
+        previous = load_ledger(self.ledger_file)
+        kept = [e for e in previous if _entry_key(e) not in resolved]
+        if not failed and len(kept) == len(previous):
+            return
+        os.makedirs(os.path.dirname(self.ledger_file) or ".", exist_ok=True)
+        with open(self.ledger_file, "w") as f:
+            json.dump(kept + failed, f, indent=2)
+        if failed:
+            print(f"Logged {len(failed)} failed fetches → {self.ledger_file}")
+        if len(kept) < len(previous):
+            print(f"Cleared {len(previous) - len(kept)} fetches that succeeded on retry")
+
+
+def _entry_key(entry):
+    # entries written before keys existed only have the url
+    return entry.get("key") or entry["url"]
+
+
+def load_ledger(path=LEDGER_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def pending_keys(path=LEDGER_FILE, url=None):
+    """Unique keys still failing in the ledger (only calls to url, if given)."""
+    return list(dict.fromkeys(
+        _entry_key(e) for e in load_ledger(path) if url is None or e["url"] == url
+    ))
+
+
+# Shared instance used across the pipeline
+governor = FetchGovernor()
+
+
+# --------------------------------------------------------
+# Embeddings through the governor
+# --------------------------------------------------------
+_client = None
+
+
+def openai_client():
+    """
+    OpenAI client, created on first use so importing this module doesn't
+    load the SDK. SDK retries are off: the governor does the retrying, so
+    its AIMD sees every 429.
+    """
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(max_retries=0)
+    return _client
+
+
+def embed_texts(texts, model, key=None):
+    """(len(texts), dim) array of embeddings. key names the item in the failure ledger."""
+    import numpy as np
+
+    resp = governor.call(EMBEDDINGS_URL, openai_client().embeddings.create,
+                         model=model, input=list(texts), key=key)
+    return np.array([d.embedding for d in resp.data])
+
+
+# Vectors cached by text, so a rerun (or a retry after failures) only
+# embeds new, changed or previously failed items
+def text_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def load_embedding_cache(path):
+    """text key → vector, from earlier runs."""
+    import numpy as np
+
+    if not os.path.exists(path):
+        return {}
+    with np.load(path) as saved:
+        return dict(zip(saved["keys"].tolist(), saved["vectors"]))
+
+
+def save_embedding_cache(path, cache):
+    import numpy as np
+
+    if not cache:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, keys=np.array(list(cache)), vectors=np.array(list(cache.values())))
+
+
+def embed_cached(texts, keys, model, cache_path, label="item"):
+    """
+    Embed texts one by one, reusing vectors cached in cache_path.
+    A failed text is logged to the ledger under its key (e.g. product URL)
+    and skipped; the cache and ledger are saved even if the run stops early.
+    Returns (vectors, failed keys); vectors[i] is None for a failed text.
+    """
+    cache = load_embedding_cache(cache_path)
+    hashes = [text_key(t) for t in texts]
+    todo = [i for i, h in enumerate(hashes) if h not in cache]
+    retried = set(pending_keys(governor.ledger_file, url=EMBEDDINGS_URL)) & {keys[i] for i in todo}
+    print(f"Embedding {len(todo)} new/changed {label}s ({len(texts) - len(todo)} cached, "
+          f"{len(retried)} failed last time)")
+
+    failed = []
+    try:
+        for n, i in enumerate(todo):
+            print(f"Embedding {label} {n + 1}/{len(todo)}: {keys[i]}")
+            try:
+                cache[hashes[i]] = embed_texts([texts[i]], model, key=keys[i])[0]
+            except Exception as e:
+                print(f"   ✗ {keys[i]}: {type(e).__name__}")
+                failed.append(keys[i])
+    finally:
+        # only current texts, so edited products don't pile up in the cache
+        save_embedding_cache(cache_path, {h: cache[h] for h in dict.fromkeys(hashes) if h in cache})
+        governor.save_ledger()
+    return [cache.get(h) for h in hashes], failed
@@ -0,0 +1,279 @@
+import hashlib
+import io
+import os
+import re
+import threading
+import numpy as np
+from PIL import Image as PILImage
+
+
+# --------------------------------------------------------
+# Perceptual image fingerprints
+#
+# Every downloaded image gets three 64-bit hashes (aHash, dHash, pHash),
+# stored as one uint64 row in data/image_hashes.npz. Hamming distance
+# between hashes tells near-duplicate images apart from different ones.
+# --------------------------------------------------------
+INDEX_FILE = "data/image_hashes.npz"
+IMAGE_DIR = "images"
+HASHES = ("ahash", "dhash", "phash")
+DUPLICATE_DISTANCE = 4      # max bits apart (pHash and dHash) to count as the same image
+
+_DCT_SIZE = 32
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    d = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+    d[0] /= np.sqrt(2.0)
+    return d
+
+
+_DCT = _dct_matrix(_DCT_SIZE)
+_BIT_WEIGHTS = (1 << np.arange(63, -1, -1, dtype=np.uint64)).astype(np.uint64)
+
+
+def _pack(bits):
+    """(n, ...) bool with 64 bits per row → (n,) uint64."""
+    return (bits.reshape(len(bits), 64).astype(np.uint64) * _BIT_WEIGHTS).sum(
+        axis=-1, dtype=np.uint64
+    )
+
+
+def _gray(img, size):
+    return np.asarray(img.convert("L").resize(size, PILImage.LANCZOS), dtype=np.float32)
+
+
+# --------------------------------------------------------
+# Hashes (vectorized over a batch of grayscale arrays)
+# --------------------------------------------------------
+def ahash(pixels):
+    """pixels: (n, 8, 8)"""
+    mean = pixels.mean(axis=(1, 2), keepdims=True)
+    return _pack(pixels > mean)
+
+
+def dhash(pixels):
+    """pixels: (n, 8, 9) — compares horizontal neighbours."""
+    return _pack(pixels[:, :, 1:] > pixels[:, :, :-1])
+
+
+def phash(pixels):
+    """pixels: (n, 32, 32) — low-frequency DCT coefficients vs their median."""
+    coeffs = np.einsum("ij,njk,lk->nil", _DCT, pixels, _DCT)[:, :8, :8].reshape(-1, 64)
+    median = np.median(coeffs[:, 1:], axis=1, keepdims=True)   # skip the DC term
+    return _pack(coeffs > median)
+
+
+def image_hashes(images):
+    """PIL images (or PNG/JPEG bytes) → (n, 3) uint64 array of aHash/dHash/pHash."""
+    imgs = [PILImage.open(io.BytesIO(i)) if isinstance(i, (bytes, bytearray)) else i
+            for i in images]
+    if not imgs:
+        return np.empty((0, 3), dtype=np.uint64)
+    return np.stack([
+        ahash(np.stack([_gray(i, (8, 8)) for i in imgs])),
+        dhash(np.stack([_gray(i, (9, 8)) for i in imgs])),
+        phash(np.stack([_gray(i, (_DCT_SIZE, _DCT_SIZE)) for i in imgs])),
+    ], axis=1)
+
+
+def hamming(a, b):
+    """Bitwise distance between uint64 arrays (broadcasts)."""
+    x = np.ascontiguousarray(
+        np.bitwise_xor(np.asarray(a, dtype=np.uint64), np.asarray(b, dtype=np.uint64))
+    )
+    return np.unpackbits(x[..., None].view(np.uint8), axis=-1).sum(axis=-1)
+
+
+def image_similarity(a, b):
+    """0..1 score from two (3,) hash rows — a cheap extra matching signal."""
+    return float(1.0 - hamming(a, b).mean() / 64.0)
+
+
+# --------------------------------------------------------
+# BK-tree for hamming radius search
+# --------------------------------------------------------
+class BKTree:
+    def __init__(self):
+        self.root = None        # [hash, item, {distance: child}]
+
+    def add(self, value, item):
+        node = [int(value), item, {}]
+        if self.root is None:
+            self.root = node
+            return
+        cur = self.root
+        while True:
+            d = (cur[0] ^ node[0]).bit_count()
+            if d in cur[2]:
+                cur = cur[2][d]
+            else:
+                cur[2][d] = node
+                return
+
+    def search(self, value, radius):
+        """[(distance, item)] within radius, closest first."""
+        value = int(value)
+        found, stack = [], [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            d = (node[0] ^ value).bit_count()
+            if d <= radius:
+                found.append((d, node[1]))
+            for dist, child in node[2].items():
+                if d - radius <= dist <= d + radius:
+                    stack.append(child)
+        return sorted(found, key=lambda f: f[0])
+
+
+# --------------------------------------------------------
+# Image files are named by content, so a path always holds the same
+# picture: no later download can overwrite it with another product's.
+# --------------------------------------------------------
+_CONTENT_NAME = re.compile(r"[0-9a-f]{16}\.png")
+
+
+def content_path(png_bytes, image_dir=IMAGE_DIR):
+    """images/<sha1 of the PNG bytes>.png"""
+    return os.path.join(image_dir, hashlib.sha1(png_bytes).hexdigest()[:16] + ".png")
+
+
+def is_content_path(img_path):
+    return bool(_CONTENT_NAME.fullmatch(os.path.basename(img_path)))
+
+
+# --------------------------------------------------------
+# Index of downloaded images
+# --------------------------------------------------------
+class ImageIndex:
+    def __init__(self):
+        self.urls = []
+        self.paths = []
+        self._rows = []
+        self._array = None
+        self._by_url = {}
+        self._tree = BKTree()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        index = cls()
+        if os.path.exists(path):
+            with np.load(path) as z:
+                for url, img_path, row in zip(z["urls"].tolist(), z["paths"].tolist(), z["hashes"]):
+                    # rows for files named product_<idx>.png (older runs) may
+                    # describe a picture that has since been overwritten
+                    if is_content_path(img_path) and os.path.exists(img_path):
+                        index._append(url, img_path, row)
+        return index
+
+    def save(self, path=INDEX_FILE):
+        with self._lock:
+            np.savez(path, urls=np.array(self.urls, dtype=str),
+                     paths=np.array(self.paths, dtype=str), hashes=self.hashes)
+
+    def __len__(self):
+        return len(self.urls)
+
+    @property
+    def hashes(self):
+        """(n, 3) uint64 array, rebuilt lazily after additions."""
+        if self._array is None or len(self._array) != len(self._rows):
+            self._array = np.array(self._rows, dtype=np.uint64).reshape(-1, 3)
+        return self._array
+
+    def _append(self, url, img_path, row):
+        i = len(self.urls)
+        self.urls.append(url)
+        self.paths.append(img_path)
+        self._rows.append(np.asarray(row, dtype=np.uint64))
+        self._by_url.setdefault(url, i)
+        self._tree.add(row[2], i)
+        return i
+
+    def add(self, url, img_path, row):
+        with self._lock:
+            return self._append(url, img_path, row)
+
+    def path_for_url(self, url):
+        """Local file already downloaded for this image URL, if any."""
+        i = self._by_url.get(url)
+        return self.paths[i] if i is not None else None
+
+    def find_duplicate(self, row, max_distance=DUPLICATE_DISTANCE):
+        """Index of a stored near-duplicate of hash row (pHash and dHash close), else None."""
+        with self._lock:
+            for _, i in self._tree.search(row[2], max_distance):
+                if (int(self._rows[i][1]) ^ int(row[1])).bit_count() <= max_distance:
+                    return i
+        return None
+
+    def canonical_path(self, img_path):
+        """First stored file that looks the same as img_path (itself if unknown)."""
+        try:
+            i = self.paths.index(img_path)
+        except ValueError:
+            return img_path
+        dup = self.find_duplicate(self.hashes[i])
+        return self.paths[dup] if dup is not None else img_path
+
+    def similarity(self, path_a, path_b):
+        """Image similarity of two indexed files (None if either isn't indexed)."""
+        try:
+            a, b = self.paths.index(path_a), self.paths.index(path_b)
+        except ValueError:
+            return None
+        return image_similarity(self.hashes[a], self.hashes[b])
+
+    def similarities(self, row):
+        """Vectorized similarity of a hash row against every stored image."""
+        if not len(self):
+            return np.empty(0)
+        return 1.0 - hamming(self.hashes, row).mean(axis=1) / 64.0
+
+
+# --------------------------------------------------------
+# Backfill the index from images already on disk
+# --------------------------------------------------------
+if __name__ == "__main__":
+    import json
+
+    with open("data/tomko_products.json", "r") as f:
+        products = json.load(f)
+
+    index = ImageIndex.load()
+    todo, new_paths, moved = [], {}, 0
+    for p in products:
+        path = p.get("ImagePath")
+        if not path or is_content_path(path):
+            continue
+        # older product_<idx>.png files → their content-named path, so the
+        # product files and the index agree on where each picture lives
+        indexed = index.path_for_url(p.get("ImageURL")) or new_paths.get(p.get("ImageURL"))
+        if indexed is None and os.path.exists(path):
+            with open(path, "rb") as f:
+                png_bytes = f.read()
+            indexed = content_path(png_bytes)
+            if not os.path.exists(indexed):
+                with open(indexed, "wb") as f:
+                    f.write(png_bytes)
+            todo.append((p["ImageURL"], indexed))
+            new_paths[p["ImageURL"]] = indexed
+        if indexed is not None:
+            p["ImagePath"] = indexed
+            moved += 1
+
+    rows = image_hashes([PILImage.open(path) for _, path in todo])
+    for (url, path), row in zip(todo, rows):
+        index.add(url, path, row)
+    index.save()
+    print(f"Indexed {len(todo)} images ({len(index)} total) → {INDEX_FILE}")
+
+    if moved:
+        import pandas as pd
+        from tomko_scraper import save_outputs
+
+        save_outputs(pd.DataFrame(products))
+        print(f"Updated ImagePath of {moved} products")
@@ -1,43 +1,42 @@
 import json
 import numpy as np
-import openai
-import os
 
+from fetch_governor import embed_cached, load_embedding_cache
+from match_store import MatchStore
+from price_history import parse_price
+from dedupe import load_canonical
 
-# -------------------------------
-# 1. Load API key from terminal
-# -------------------------------
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
 # -------------------------------
-# 2. File paths for your project
+# 1. File paths for your project
 # -------------------------------
 TOMKO_JSON = "data/tomko_products.json"
 NWS_JSON   = "data/nws_products.json"
+NWS_CANONICAL_JSON = "data/nws_products_canonical.json"
 TOMKO_EMB  = "data/tomko_embeddings.npy"
+NWS_EMB    = "data/nws_match_embeddings.npz"
+MATCH_STORE = "data/match_store.json"
+MATCHES_JSON = "data/tomko_to_nws_matches.json"
+
 
 # -------------------------------
-# 3. Load files
+# 2. Load files
 # -------------------------------
-with open(TOMKO_JSON, "r") as f:
-    tomko_data = json.load(f)
+def load_data():
+    with open(TOMKO_JSON, "r") as f:
+        tomko_data = json.load(f)
 
-with open(NWS_JSON, "r") as f:
-    nws_data = json.load(f)
+    # canonical products only, so one product can't fill several match slots
+    nws_data = load_canonical(NWS_CANONICAL_JSON, NWS_JSON)
 
-tomko_embeddings = np.load(TOMKO_EMB)
+    tomko_embeddings = np.load(TOMKO_EMB)
+    return tomko_data, tomko_embeddings, nws_data
 
 
 # -------------------------------
-# 4. Embed competitor products
+# 3. Embed competitor products
 # -------------------------------
-def embed_text(text):
-    """Uses OpenAI text-embedding-3-small without putting key in code."""
-    resp = openai.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
-    )
-    return np.array(resp.data[0].embedding)
+MODEL = "text-embedding-3-small"
 
 
 def competitor_text(p):
@@ -47,56 +46,126 @@ def competitor_text(p):
     return f"{name}. Price {price}."
 
 
-# Generate embeddings for all NWS products
-nws_embeddings = []
-for p in nws_data:
-    nws_embeddings.append(embed_text(competitor_text(p)))
+def load_competitor_cache(cache_path=NWS_EMB):
+    """text key → vector, from the last run."""
+    return load_embedding_cache(cache_path)
 
-nws_embeddings = np.array(nws_embeddings)
+
+def embed_competitors(products, cache_path=NWS_EMB):
+    """
+    Vectors for products, reusing the cache for unchanged text.
+    Products whose embedding failed are left out of this run (they are in
+    the failure ledger and retried next time). Returns (products, vectors).
+    """
+    vectors, failed = embed_cached([competitor_text(p) for p in products],
+                                   [p["url"] for p in products], MODEL, cache_path,
+                                   label="competitor")
+    if failed:
+        print(f"⚠️ {len(failed)} competitors left out until their embedding succeeds")
+    keep = [i for i, v in enumerate(vectors) if v is not None]
+    return [products[i] for i in keep], np.array([vectors[i] for i in keep]).reshape(len(keep), -1)
 
 
 # -------------------------------
-# 5. MATCHING ENGINE
-# TOMKO → NWS (client-first)
+# 4. MATCHING ENGINE
+# TOMKO → NWS (client-first), incremental via MatchStore
 # -------------------------------
-results = []
+def competitor_match(c, sim):
+    """One entry of a SKU's "Matches" list."""
+    price_value, currency = parse_price(c["price"])
+    return {
+        "CompetitorName": c["name"],
+        "CompetitorPrice": c["price"],
+        "CompetitorPriceValue": price_value,
+        "CompetitorCurrency": currency,
+        "CompetitorURL": c["url"],
+        "Similarity": sim
+    }
+
+
+def match_all(tomko_data, tomko_embeddings, nws_data, nws_embeddings, store):
+    stats = store.update(
+        [t["ProductURL"] for t in tomko_data], tomko_embeddings,
+        [c["url"] for c in nws_data], nws_embeddings,
+    )
+    print(f"Match store update: {stats}")
+
+    nws_by_url = {}
+    for c in nws_data:
+        nws_by_url.setdefault(c["url"], c)
+
+    results = []
+    for tomko in tomko_data:
+        matches = [competitor_match(nws_by_url[url], sim)
+                   for sim, url in store.top(tomko["ProductURL"])]
+        results.append({
+            "TomkoProduct": tomko["ProductName"],
+            "TomkoURL": tomko["ProductURL"],
+            "Matches": matches
+        })
+    return results
+
 
+# Global modes: at most one competitor per SKU and one SKU per competitor
+def match_global(tomko_data, tomko_embeddings, nws_data, nws_embeddings, store,
+                 mode="assign", solver="hungarian", candidates=None, min_similarity=None):
+    """Pairs from the store's sparse candidate graph instead of per-SKU top-k."""
+    from assignment import (CANDIDATES, graph_from_store, greedy_assignment,
+                            hungarian_assignment, mutual_best, reverse_best)
 
-def cosine_sim(a, b):
-    """Compute cosine similarity between 1 vector and matrix."""
-    a_norm = a / np.linalg.norm(a)
-    b_norm = b / np.linalg.norm(b, axis=1, keepdims=True)
-    return np.dot(b_norm, a_norm)
+    rows, cols, sims = graph_from_store(
+        store, [t["ProductURL"] for t in tomko_data], [c["url"] for c in nws_data],
+        k=candidates or CANDIDATES, min_similarity=min_similarity,
+    )
+    if mode == "mutual":
+        pairs = mutual_best(rows, cols, sims, reverse_best(tomko_embeddings, nws_embeddings))
+    elif solver == "greedy":
+        pairs = greedy_assignment(rows, cols, sims)
+    else:
+        pairs = hungarian_assignment(rows, cols, sims)
+    print(f"{mode}: {len(pairs)}/{len(tomko_data)} SKUs paired")
+
+    results = []
+    for i, tomko in enumerate(tomko_data):
+        matches = []
+        if i in pairs:
+            c, sim = pairs[i]
+            matches.append(competitor_match(nws_data[c], sim))
+        results.append({
+            "TomkoProduct": tomko["ProductName"],
+            "TomkoURL": tomko["ProductURL"],
+            "Matches": matches
+        })
+    return results
 
-for idx, tomko in enumerate(tomko_data):
-    print(f"Matching Tomko SKU {idx+1}/{len(tomko_data)}: {tomko['ProductName']}")
 
-    tomko_emb = tomko_embeddings[idx]
-    sims = cosine_sim(tomko_emb, nws_embeddings)
+# -------------------------------
+# 5. Run + save results
+# -------------------------------
+def main(mode="topk", solver="hungarian", candidates=None, min_similarity=None):
+    tomko_data, tomko_embeddings, nws_data = load_data()
+    nws_data, nws_embeddings = embed_competitors(nws_data)
+
+    store = MatchStore.load(MATCH_STORE, k=3)
+    results = match_all(tomko_data, tomko_embeddings, nws_data, nws_embeddings, store)
+    store.save(MATCH_STORE)
 
-    top3_idx = sims.argsort()[::-1][:3]
+    out_path = MATCHES_JSON
+    if mode != "topk":
+        results = match_global(tomko_data, tomko_embeddings, nws_data, nws_embeddings,
+                               store, mode=mode, solver=solver,
+                               candidates=candidates, min_similarity=min_similarity)
+        out_path = MATCHES_JSON.replace(".json", f"_{mode}.json")
 
-    matches = []
-    for i in top3_idx:
-        c = nws_data[i]
-        matches.append({
-            "CompetitorName": c["name"],
-            "CompetitorPrice": c["price"],
-            "CompetitorURL": c["url"],
-            "Similarity": float(sims[i])
-        })
+    with open(out_path, "w") as f:
+        json.dump(results, f, indent=4)
 
-    results.append({
-        "TomkoProduct": tomko["ProductName"],
-        "TomkoURL": tomko["ProductURL"],
-        "Matches": matches
-    })
+    print(f"\n🎉 Saved results → {out_path}")
 
 
-# -------------------------------
-# 6. Save results
-# -------------------------------
-with open("data/tomko_to_nws_matches.json", "w") as f:
-    json.dump(results, f, indent=4)
+if __name__ == "__main__":
+    import sys
+    import cli
 
-print("\n🎉 Saved results → data/tomko_to_nws_matches.json")
+    # same options as `python cli.py match`
+    cli.main(["match"] + sys.argv[1:])
@@ -0,0 +1,336 @@
+import argparse
+import importlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+import match_products as mp
+from fetch_governor import embed_texts, text_key
+from match_store import normalize_rows, top_n
+
+
+# --------------------------------------------------------
+# Local match service
+#
+#   python match_service.py [--port 8765] [--provider module:Class]
+#
+#   GET  /health
+#   GET  /match/sku?url=<TomkoURL>&k=3
+#   POST /match/text   {"text": "...", "k": 3}
+#   POST /reload
+#
+# Vectors and metadata are loaded once and kept in memory. Queries are
+# micro-batched into one matrix multiply, and updated vector files are
+# picked up by building a new index next to the live one and swapping it in.
+# --------------------------------------------------------
+DEFAULT_PORT = 8765
+MAX_K = 50
+MAX_BATCH = 64
+# Seconds a query waits for others to join its batch. 0 = only batch what
+# queued up while the previous batch ran (no added latency when idle).
+MAX_WAIT = 0.0
+WATCH_INTERVAL = 2.0
+
+WATCHED_FILES = (mp.TOMKO_JSON, mp.TOMKO_EMB, mp.NWS_CANONICAL_JSON, mp.NWS_EMB)
+
+
+# --------------------------------------------------------
+# Embedding providers (for free-text queries)
+# --------------------------------------------------------
+class OpenAIProvider:
+    """Same model as the Tomko/NWS match vectors."""
+    model = mp.MODEL
+
+    def embed(self, texts):
+        return embed_texts(texts, self.model)
+
+
+def load_provider(spec):
+    """"package.module:ClassName" → provider instance with .embed(texts)."""
+    if not spec:
+        return OpenAIProvider()
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+# --------------------------------------------------------
+# In-memory index (immutable; reload builds a new one)
+# --------------------------------------------------------
+def files_version():
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else 0 for p in WATCHED_FILES)
+
+
+class MatchIndex:
+    def __init__(self, tomko_data, tomko_vectors, nws_data, nws_vectors, version=None):
+        # a half-written embeddings file would shift every SKU onto the wrong row
+        if len(tomko_data) != len(tomko_vectors):
+            raise ValueError(
+                f"{len(tomko_data)} Tomko products but {len(tomko_vectors)} Tomko vectors"
+            )
+        if len(nws_data) != len(nws_vectors):
+            raise ValueError(f"{len(nws_data)} NWS products but {len(nws_vectors)} NWS vectors")
+        if len(nws_vectors) and tomko_vectors.shape[1] != nws_vectors.shape[1]:
+            raise ValueError(
+                f"Tomko vectors have {tomko_vectors.shape[1]} dims, NWS have {nws_vectors.shape[1]}"
+            )
+        self.tomko_data = tomko_data
+        self.tomko_row = {}
+        for i, t in enumerate(tomko_data):
+            self.tomko_row.setdefault(t["ProductURL"], i)
+        self.T = normalize_rows(tomko_vectors)
+        self.nws_data = nws_data
+        self.N = normalize_rows(nws_vectors)
+        self.version = version
+
+    @classmethod
+    def load(cls):
+        version = files_version()
+        tomko_data, tomko_vectors, nws_data = mp.load_data()
+
+        # competitor vectors come from match_products' cache; products
+        # that haven't been embedded yet are left out until the next run
+        cache = mp.load_competitor_cache()
+        keys = [text_key(mp.competitor_text(c)) for c in nws_data]
+        keep = [i for i, k in enumerate(keys) if k in cache]
+        if len(keep) < len(nws_data):
+            print(f"⚠️ {len(nws_data) - len(keep)} competitors have no vector yet; run match_products.py")
+        nws_vectors = np.array([cache[keys[i]] for i in keep]).reshape(len(keep), -1)
+        return cls(tomko_data, tomko_vectors, [nws_data[i] for i in keep], nws_vectors, version)
+
+    def search(self, queries):
+        """queries: [(vector, k)] → [[(similarity, nws product)], ...]"""
+        Q = normalize_rows(np.stack([q[0] for q in queries]))
+        sims = Q @ self.N.T
+        best = top_n(sims, max(q[1] for q in queries))
+        return [
+            [(float(sims[row, j]), self.nws_data[j]) for j in best[row][:k]]
+            for row, (_, k) in enumerate(queries)
+        ]
+
+
+# --------------------------------------------------------
+# Micro-batching
+# --------------------------------------------------------
+class MicroBatcher:
+    """Collects concurrent calls for up to max_wait and runs fn once on the batch."""
+
+    def __init__(self, fn, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, item):
+        fut = Future()
+        self.queue.put((item, fut))
+        return fut.result()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    # past the deadline, still take whatever is already queued
+                    if remaining > 0:
+                        batch.append(self.queue.get(timeout=remaining))
+                    else:
+                        batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                results = self.fn([item for item, _ in batch])
+                for (_, fut), result in zip(batch, results):
+                    fut.set_result(result)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+
+
+# --------------------------------------------------------
+# Service
+# --------------------------------------------------------
+class EmbeddingError(RuntimeError):
+    """The provider could not embed a free-text query."""
+
+
+class MatchService:
+    def __init__(self, provider=None):
+        self.provider = provider or OpenAIProvider()
+        self.index = MatchIndex.load()
+        self._reload_lock = threading.Lock()
+        self._failed_version = None     # files that failed to load; retried once they change
+        # each batch reads self.index once, so a swap never mixes two indexes
+        self.searcher = MicroBatcher(lambda queries: self.index.search(queries))
+        self.embedder = MicroBatcher(self.provider.embed)
+
+    def reload(self, force=False):
+        """Build a fresh index from disk and swap it in. Returns True if swapped."""
+        with self._reload_lock:
+            version = files_version()
+            if not force and version in (self.index.version, self._failed_version):
+                return False
+            try:
+                self.index = MatchIndex.load()
+            except Exception:
+                self._failed_version = version
+                raise
+            self._failed_version = None
+            return True
+
+    def watch(self, interval=WATCH_INTERVAL):
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    if self.reload():
+                        print("🔄 Reloaded match index")
+                except Exception as e:
+                    print(f"⚠️ Reload failed, keeping current index: {e}")
+        threading.Thread(target=loop, daemon=True).start()
+
+    def _matches(self, hits):
+        return [mp.competitor_match(c, sim) for sim, c in hits]
+
+    def match_sku(self, url, k=3):
+        index = self.index
+        row = index.tomko_row.get(url)
+        if row is None:
+            return None
+        hits = self.searcher.submit((index.T[row], k))
+        tomko = index.tomko_data[row]
+        return {
+            "TomkoProduct": tomko["ProductName"],
+            "TomkoURL": tomko["ProductURL"],
+            "Matches": self._matches(hits)
+        }
+
+    def match_text(self, text, k=3):
+        try:
+            vector = self.embedder.submit(text)
+        except Exception as e:
+            raise EmbeddingError(str(e)) from e
+        hits = self.searcher.submit((vector, k))
+        return {"Query": text, "Matches": self._matches(hits)}
+
+
+# --------------------------------------------------------
+# HTTP layer
+# --------------------------------------------------------
+class MatchHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128    # default of 5 drops bursts into 1s SYN retries
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"     # keep-alive; every response sets Content-Length
+        disable_nagle_algorithm = True    # headers and body are separate writes
+
+        def _send(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _k(self, value):
+            try:
+                return max(1, min(MAX_K, int(value)))
+            except (TypeError, ValueError):
+                return 3
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            params = parse_qs(parsed.query)
+            if parsed.path == "/health":
+                index = service.index
+                return self._send(200, {"status": "ok",
+                                        "tomko": len(index.tomko_data),
+                                        "nws": len(index.nws_data)})
+            if parsed.path == "/match/sku":
+                url = params.get("url", [""])[0]
+                try:
+                    result = service.match_sku(url, self._k(params.get("k", [3])[0]))
+                except Exception as e:
+                    return self._send(500, {"error": str(e)})
+                if result is None:
+                    return self._send(404, {"error": f"unknown SKU url: {url}"})
+                return self._send(200, result)
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            path = urlparse(self.path).path
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length < 0:
+                    raise ValueError(length)
+            except ValueError:
+                # the body can't be skipped, so the connection can't be reused
+                self.close_connection = True
+                return self._send(400, {"error": "invalid Content-Length"})
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                return self._send(400, {"error": "invalid JSON"})
+            if not isinstance(body, dict):
+                return self._send(400, {"error": "JSON body must be an object"})
+
+            if path == "/match/text":
+                text = body.get("text")
+                if not text or not isinstance(text, str):
+                    return self._send(400, {"error": "missing 'text'"})
+                try:
+                    return self._send(200, service.match_text(text, self._k(body.get("k", 3))))
+                except EmbeddingError as e:
+                    return self._send(502, {"error": f"embedding failed: {e}"})
+                except Exception as e:
+                    return self._send(500, {"error": f"search failed: {e}"})
+            if path == "/reload":
+                try:
+                    return self._send(200, {"reloaded": service.reload(force=True)})
+                except Exception as e:
+                    return self._send(500, {"error": str(e)})
+            self._send(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass    # per-request logging costs more than the lookup
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="match_service.py", description="Serve Tomko → NWS matches over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--provider", help="embedding provider as module:Class (default OpenAI)")
+    parser.add_argument("--watch", type=float, default=WATCH_INTERVAL,
+                        help="seconds between checks for updated vector files (0 = off)")
+    args = parser.parse_args(argv)
+
+    service = MatchService(load_provider(args.provider))
+    if args.watch > 0:
+        service.watch(args.watch)
+
+    server = MatchHTTPServer((args.host, args.port), make_handler(service))
+    print(f"🚀 Match service on http://{args.host}:{args.port} "
+          f"({len(service.index.tomko_data)} SKUs, {len(service.index.nws_data)} competitors)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
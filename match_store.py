@@ -0,0 +1,184 @@
+import hashlib
+import heapq
+import json
+import os
+import numpy as np
+
+
+# --------------------------------------------------------
+# Persistent match store
+#
+# Remembers a version (hash) of every Tomko and NWS vector plus each
+# SKU's best candidates, so a rerun only scores what changed:
+#   - new/changed Tomko SKUs  → rescored against all competitors
+#   - new/changed competitors → scored against all unchanged SKUs and
+#                               merged into their candidate heaps
+#   - removed/changed entries → evicted from the heaps
+# A SKU is rescored in full whenever its stored top-k could be beaten by
+# a competitor that was cut off its heap earlier.
+# --------------------------------------------------------
+STORE_FILE = "data/match_store.json"
+TOP_K = 3
+DEPTH = 10          # candidates kept per SKU so evictions rarely force a rescore
+BLOCK = 1024        # SKU rows scored per matrix multiply
+
+
+def vector_version(vec):
+    return hashlib.sha1(np.asarray(vec, dtype=np.float32).tobytes()).hexdigest()[:16]
+
+
+def normalize_rows(m):
+    m = np.asarray(m, dtype=np.float32)
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def top_n(sims, n):
+    """Indices of the n largest values in each row, best first."""
+    n = min(n, sims.shape[1])
+    if n == 0:
+        return np.empty((sims.shape[0], 0), dtype=int)
+    part = np.argpartition(-sims, n - 1, axis=1)[:, :n]
+    order = np.argsort(-np.take_along_axis(sims, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+def _index(keys):
+    """key → first row index (duplicate keys keep their first row)."""
+    idx = {}
+    for i, key in enumerate(keys):
+        idx.setdefault(key, i)
+    return idx
+
+
+class MatchStore:
+    def __init__(self, k=TOP_K, depth=DEPTH):
+        self.k = k
+        self.depth = max(depth, k)
+        self.tomko_versions = {}
+        self.nws_versions = {}
+        self.matches = {}       # tomko key → [[similarity, nws key], ...] best first
+        # tomko key → best score ever cut off its heap. Competitors below
+        # that line are not stored, so any result scoring under it may be
+        # outranked by one of them. Missing key = nothing hidden.
+        self.cutoff = {}
+
+    # ----------------------------------------------------
+    # Load / save
+    # ----------------------------------------------------
+    @classmethod
+    def load(cls, path=STORE_FILE, k=TOP_K, depth=DEPTH):
+        store = cls(k=k, depth=depth)
+        if not os.path.exists(path):
+            return store
+        with open(path, "r") as f:
+            data = json.load(f)
+        # a different depth (or a store without cut-offs) means the saved
+        # heaps can't be trusted → full run
+        if data.get("depth") != store.depth or "cutoff" not in data:
+            return store
+        store.tomko_versions = data["tomko_versions"]
+        store.nws_versions = data["nws_versions"]
+        store.matches = data["matches"]
+        store.cutoff = data["cutoff"]
+        return store
+
+    def save(self, path=STORE_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "depth": self.depth,
+                "tomko_versions": self.tomko_versions,
+                "nws_versions": self.nws_versions,
+                "matches": self.matches,
+                "cutoff": self.cutoff,
+            }, f)
+
+    def _trusted(self, key):
+        """True if the stored top-k can't be beaten by a cut-off competitor."""
+        if key not in self.cutoff:
+            return True
+        heap = self.matches[key]
+        return len(heap) >= self.k and heap[self.k - 1][0] >= self.cutoff[key]
+
+    def _keep(self, key, candidates, dropped_best=None):
+        """Store the best depth candidates; remember the best one cut off."""
+        ranked = heapq.nlargest(self.depth + 1, candidates, key=lambda m: m[0])
+        if len(ranked) > self.depth:
+            dropped_best = max(ranked[self.depth][0], dropped_best or ranked[self.depth][0])
+        self.matches[key] = ranked[:self.depth]
+        if dropped_best is not None:
+            self.cutoff[key] = max(dropped_best, self.cutoff.get(key, dropped_best))
+
+    # ----------------------------------------------------
+    # Incremental update
+    # ----------------------------------------------------
+    def update(self, tomko_keys, tomko_vecs, nws_keys, nws_vecs):
+        t_idx = _index(tomko_keys)
+        n_idx = _index(nws_keys)
+        t_ver = {key: vector_version(tomko_vecs[i]) for key, i in t_idx.items()}
+        n_ver = {key: vector_version(nws_vecs[i]) for key, i in n_idx.items()}
+
+        # competitors whose old scores are no longer valid
+        stale_n = {key for key, v in self.nws_versions.items() if n_ver.get(key) != v}
+        fresh_n = [key for key, v in n_ver.items() if self.nws_versions.get(key) != v]
+
+        for key in list(self.matches):
+            if key not in t_ver:
+                del self.matches[key]
+                self.cutoff.pop(key, None)
+
+        rescore, merge = [], []
+        for key, v in t_ver.items():
+            if self.tomko_versions.get(key) != v or key not in self.matches:
+                rescore.append(key)
+                continue
+            self.matches[key] = [m for m in self.matches[key] if m[1] not in stale_n]
+            merge.append(key)
+
+        n_keys = list(n_idx)
+        T = normalize_rows(tomko_vecs)
+        N = normalize_rows(nws_vecs)[[n_idx[key] for key in n_keys]] if n_keys \
+            else np.empty((0, T.shape[1]), dtype=np.float32)
+
+        # 1. new/changed competitors against all unchanged SKUs
+        if fresh_n and merge:
+            pos = {key: i for i, key in enumerate(n_keys)}
+            C = N[[pos[key] for key in fresh_n]]
+            for start in range(0, len(merge), BLOCK):
+                keys = merge[start:start + BLOCK]
+                sims = T[[t_idx[key] for key in keys]] @ C.T
+                best = top_n(sims, self.depth + 1)
+                for row, key in enumerate(keys):
+                    new = [[float(sims[row, j]), fresh_n[j]] for j in best[row]]
+                    self._keep(key, self.matches[key] + new)
+
+        # SKUs whose heap lost too much (or whose new entries rank below
+        # competitors cut off earlier) can't be fixed up incrementally
+        repaired = [key for key in merge if not self._trusted(key)]
+        rescore += repaired
+
+        # 2. new/changed/untrusted SKUs against the full competitor set
+        for start in range(0, len(rescore), BLOCK):
+            keys = rescore[start:start + BLOCK]
+            sims = T[[t_idx[key] for key in keys]] @ N.T
+            best = top_n(sims, self.depth + 1)
+            for row, key in enumerate(keys):
+                self.cutoff.pop(key, None)
+                self._keep(key, [[float(sims[row, j]), n_keys[j]] for j in best[row]])
+
+        self.tomko_versions = t_ver
+        self.nws_versions = n_ver
+
+        return {
+            "tomko_rescored": len(rescore),
+            "tomko_repaired": len(repaired),
+            "tomko_merged": len(merge) if fresh_n else 0,
+            "nws_new_or_changed": len(fresh_n),
+            "nws_removed": len(stale_n - set(n_ver)),
+        }
+
+    def top(self, tomko_key, k=None):
+        """Best k [similarity, nws key] pairs for a SKU."""
+        return self.matches.get(tomko_key, [])[:k or self.k]
@@ -1,18 +1,26 @@
 import json
 import time
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
+
+from fetch_governor import governor
+from price_history import parse_price, append_crawl
+from dedupe import dedupe_products, save_canonical, CANONICAL_FILE
 
 
 BASE_URL = "https://www.networldsports.com/"
 OUTPUT_FILE = "data/nws_products.json"
 
+# Value of selenium's By.CSS_SELECTOR; selenium itself is only imported
+# when a driver is started, so importing this module stays cheap
+CSS_SELECTOR = "css selector"
+
 
 # ----------------------------------------------------------------
 # INIT DRIVER (Desktop mode, JS hydration friendly)
 # ----------------------------------------------------------------
 def init_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
     options = Options()
     options.add_argument("--start-maximized")
     options.add_argument("--disable-blink-features=AutomationControlled")
@@ -20,7 +28,9 @@ def init_driver():
     options.add_argument("--disable-gpu")
 
     driver = webdriver.Chrome(options=options)
-    driver.get(BASE_URL)
+    # raise TimeoutException instead of hanging, so the governor can back off
+    driver.set_page_load_timeout(60)
+    governor.call(BASE_URL, driver.get, BASE_URL)
 
     # WAIT for hydration
     time.sleep(4)
@@ -47,7 +57,7 @@ def get_top_categories(driver):
 
     for sel in nav_selectors:
         try:
-            items = driver.find_elements(By.CSS_SELECTOR, sel)
+            items = driver.find_elements(CSS_SELECTOR, sel)
             for a in items:
                 href = a.get_attribute("href")
                 txt = a.text.strip()
@@ -87,7 +97,11 @@ def get_top_categories(driver):
 # ----------------------------------------------------------------
 def get_subcategories(driver, category_url):
     print(f"\n📂 Loading category: {category_url}")
-    driver.get(category_url)
+    try:
+        governor.call(category_url, driver.get, category_url)
+    except Exception:
+        print("   ✗ Category failed, logged for retry")
+        return []
     time.sleep(2)
     driver.execute_script("window.scrollTo(0, 400);")
     time.sleep(1)
@@ -103,7 +117,7 @@ def get_subcategories(driver, category_url):
     subcats = []
 
     for sel in selectors:
-        tiles = driver.find_elements(By.CSS_SELECTOR, sel)
+        tiles = driver.find_elements(CSS_SELECTOR, sel)
         if len(tiles) >= 3:  # sanity check: equipment categories have 6-10 tiles
             for t in tiles:
                 href = t.get_attribute("href")
@@ -131,7 +145,7 @@ def extract_price(card):
 
     for sel in selectors:
         try:
-            el = card.find_element(By.CSS_SELECTOR, sel)
+            el = card.find_element(CSS_SELECTOR, sel)
             txt = el.text.strip()
             if txt and "$" in txt:
                 return txt
@@ -148,7 +162,11 @@ def extract_price(card):
 # ----------------------------------------------------------------
 def scrape_plp(driver, plp_url, sub_category, category):
     print(f"\n🛒 Scraping PLP: {plp_url}")
-    driver.get(plp_url)
+    try:
+        governor.call(plp_url, driver.get, plp_url)
+    except Exception:
+        print("   ✗ PLP failed, logged for retry")
+        return []
     time.sleep(2)
     driver.execute_script("window.scrollTo(0, 300);")
     time.sleep(1)
@@ -162,7 +180,7 @@ def scrape_plp(driver, plp_url, sub_category, category):
 
     tiles = []
     for sel in selectors:
-        items = driver.find_elements(By.CSS_SELECTOR, sel)
+        items = driver.find_elements(CSS_SELECTOR, sel)
         if len(items) > 0:
             tiles = items
             break
@@ -174,17 +192,20 @@ def scrape_plp(driver, plp_url, sub_category, category):
     for item in tiles:
         try:
             # title
-            name_el = item.find_element(By.CSS_SELECTOR, "a.product.photo.product-item-photo")
+            name_el = item.find_element(CSS_SELECTOR, "a.product.photo.product-item-photo")
             name = name_el.get_attribute("title") or name_el.text.strip()
 
             # price
             price = extract_price(item)
+            price_value, currency = parse_price(price)
             # url
             url = name_el.get_attribute("href")
 
             products.append({
                 "name": name,
                 "price": price,
+                "price_value": price_value,
+                "currency": currency,
                 "url": url,
                 "subcat":sub_category,
                 "cat":category
@@ -225,6 +246,7 @@ def main():
             products = scrape_plp(driver, sub_url, sub_name,cat_name)
             all_products.extend(products)
     driver.quit()
+    governor.save_ledger()
 
     # 4. Save output
     with open(OUTPUT_FILE, "w") as f:
@@ -233,6 +255,15 @@ def main():
     print(f"\n🎉 DONE! Total products scraped: {len(all_products)}")
     print(f"Saved to: {OUTPUT_FILE}")
 
+    # 5. Collapse products listed under several subcategories
+    canonical = dedupe_products(all_products)
+    save_canonical(canonical)
+    print(f"Canonical products: {len(canonical)} → {CANONICAL_FILE}")
+
+    # 6. Append this crawl to the price history
+    history_path = append_crawl(all_products)
+    print(f"Price history → {history_path}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import numpy as np
+from PIL import Image as PILImage
+
+
+# --------------------------------------------------------
+# OCR preprocessing
+#
+# OCR detection time grows with pixel count, and the brand text on the
+# ~440px product shots is still read at a 320px long side (below ~200px
+# it is lost; see benchmark_ocr.py). Downscale to that, convert to
+# grayscale and (optionally) crop to the text-dense region, then cache
+# the result on disk so reruns skip the work.
+# --------------------------------------------------------
+CACHE_DIR = "data/ocr_cache"
+MAX_SIDE = 320              # px, long side OCR runs at
+MIN_SIDE = 64
+EDGE_THRESHOLD = 40         # grayscale step that counts as an edge
+BLOCK = 16                  # block size for the text-region map
+
+
+def _edges(gray):
+    """Boolean map of strong horizontal intensity changes (text strokes)."""
+    gx = np.abs(np.diff(gray.astype(np.int16), axis=1))
+    return gx > EDGE_THRESHOLD
+
+
+def text_region(gray, margin=BLOCK):
+    """
+    Bounding box (left, top, right, bottom) of blocks with dense edges,
+    or None when the text covers (nearly) the whole image.
+    """
+    edges = _edges(gray)
+    h, w = gray.shape
+    bh, bw = edges.shape[0] // BLOCK, edges.shape[1] // BLOCK
+    if bh < 2 or bw < 2:
+        return None
+    density = edges[:bh * BLOCK, :bw * BLOCK].reshape(bh, BLOCK, bw, BLOCK).mean(axis=(1, 3))
+    dense = density > max(0.05, density.mean())
+    if not dense.any():
+        return None
+    rows, cols = np.flatnonzero(dense.any(axis=1)), np.flatnonzero(dense.any(axis=0))
+    box = (
+        int(max(0, cols[0] * BLOCK - margin)),
+        int(max(0, rows[0] * BLOCK - margin)),
+        int(min(w, (cols[-1] + 1) * BLOCK + margin)),
+        int(min(h, (rows[-1] + 1) * BLOCK + margin)),
+    )
+    if (box[2] - box[0]) * (box[3] - box[1]) > 0.9 * w * h:
+        return None
+    return box
+
+
+def preprocess_image(img, crop=False):
+    """PIL image → downscaled grayscale (optionally cropped) PIL image."""
+    gray = img.convert("L")
+    if crop:
+        box = text_region(np.asarray(gray))
+        if box:
+            gray = gray.crop(box)
+
+    w, h = gray.size
+    scale = min(MAX_SIDE / max(w, h), 1.0)      # never upscale
+    scale = max(scale, MIN_SIDE / min(w, h))
+    if scale < 1.0:
+        gray = gray.resize((max(1, round(w * scale)), max(1, round(h * scale))),
+                           PILImage.LANCZOS)
+    return gray
+
+
+# --------------------------------------------------------
+# Cached entry point used by brand OCR
+# --------------------------------------------------------
+def cache_key(image_path, crop):
+    with open(image_path, "rb") as f:
+        digest = hashlib.sha1(f.read())
+    digest.update(f"{MAX_SIDE}:{MIN_SIDE}:{int(crop)}".encode())
+    return digest.hexdigest()[:20]
+
+
+def preprocess_for_ocr(image_path, crop=False, cache_dir=CACHE_DIR):
+    """Path of the preprocessed copy of image_path (created on first use)."""
+    out = os.path.join(cache_dir, cache_key(image_path, crop) + ".png")
+    if os.path.exists(out):
+        return out
+    os.makedirs(cache_dir, exist_ok=True)
+    with PILImage.open(image_path) as img:
+        preprocess_image(img, crop=crop).save(out, format="PNG")
+    return out
@@ -0,0 +1,185 @@
+import os
+import re
+import time
+import numpy as np
+
+# pandas is only needed by the query helpers and is imported there
+
+
+# --------------------------------------------------------
+# Price history store
+#
+# One partition per crawl:
+#   data/price_history/crawl=<YYYYmmddTHHMMSS>[-NNN]/prices.npz
+# (the -NNN suffix only when several crawls start within one second)
+# Each partition holds column arrays (url, value, currency, crawl_ts),
+# so queries only load the partitions they need and stay vectorized.
+# --------------------------------------------------------
+HISTORY_DIR = "data/price_history"
+PARTITION_FILE = "prices.npz"
+
+CURRENCY_SYMBOLS = {
+    "US$": "USD",
+    "CA$": "CAD",
+    "C$": "CAD",
+    "$": "USD",     # networldsports.com prices in USD
+    "£": "GBP",
+    "€": "EUR",
+}
+PRICE_RE = re.compile(r"(US\$|CA\$|C\$|\$|£|€)\s*([0-9][0-9,]*(?:\.[0-9]+)?)")
+
+
+# --------------------------------------------------------
+# "$1,299.00" → (1299.0, "USD"); "N/A" → (None, None)
+# --------------------------------------------------------
+def parse_price(text):
+    if not isinstance(text, str):
+        return None, None
+    # sale tiles render "final regular"; the first price is the one charged
+    m = PRICE_RE.search(text)
+    if not m:
+        return None, None
+    return float(m.group(2).replace(",", "")), CURRENCY_SYMBOLS[m.group(1)]
+
+
+# --------------------------------------------------------
+# Write one crawl
+# --------------------------------------------------------
+def append_crawl(products, crawl_ts=None, history_dir=HISTORY_DIR):
+    """Store url/price columns of a crawl as a new partition. Returns its path."""
+    crawl_ts = int(crawl_ts or time.time())
+    seen = {}
+    for p in products:
+        value, currency = p.get("price_value"), p.get("currency")
+        if value is None and currency is None:
+            value, currency = parse_price(p.get("price"))
+        # same product can be listed under several subcategories
+        seen.setdefault(p["url"], (value, currency))
+
+    urls = list(seen)
+    values = np.array([seen[u][0] if seen[u][0] is not None else np.nan for u in urls],
+                      dtype=np.float64)
+    currencies = np.array([seen[u][1] or "" for u in urls], dtype="U3")
+
+    name = "crawl=" + time.strftime("%Y%m%dT%H%M%S", time.gmtime(crawl_ts))
+    os.makedirs(history_dir, exist_ok=True)
+    # never overwrite an earlier crawl from the same second; the zero-padded
+    # suffix keeps partitions sorting in crawl order
+    part_dir = os.path.join(history_dir, name)
+    n = 0
+    while True:
+        try:
+            os.mkdir(part_dir)
+            break
+        except FileExistsError:
+            n += 1
+            part_dir = os.path.join(history_dir, f"{name}-{n:03d}")
+    path = os.path.join(part_dir, PARTITION_FILE)
+    np.savez(
+        path,
+        url=np.array(urls, dtype=str),
+        value=values,
+        currency=currencies,
+        crawl_ts=np.full(len(urls), crawl_ts, dtype=np.int64),
+    )
+    return path
+
+
+# --------------------------------------------------------
+# Read partitions
+# --------------------------------------------------------
+def list_crawls(history_dir=HISTORY_DIR):
+    """Partition directories, oldest first (names sort chronologically)."""
+    if not os.path.isdir(history_dir):
+        return []
+    return sorted(
+        os.path.join(history_dir, d) for d in os.listdir(history_dir)
+        if d.startswith("crawl=")
+    )
+
+
+def load_crawl(part_dir):
+    import pandas as pd
+
+    with np.load(os.path.join(part_dir, PARTITION_FILE)) as z:
+        return pd.DataFrame({k: z[k] for k in ("url", "value", "currency", "crawl_ts")})
+
+
+def load_history(last=None, history_dir=HISTORY_DIR):
+    """All crawls (or only the last N) as one frame."""
+    import pandas as pd
+
+    crawls = list_crawls(history_dir)
+    if last:
+        crawls = crawls[-last:]
+    if not crawls:
+        return pd.DataFrame(columns=["url", "value", "currency", "crawl_ts"])
+    return pd.concat([load_crawl(c) for c in crawls], ignore_index=True)
+
+
+# --------------------------------------------------------
+# Query: what changed since the previous crawl
+# --------------------------------------------------------
+def price_changes(history_dir=HISTORY_DIR):
+    import pandas as pd
+
+    crawls = list_crawls(history_dir)
+    if len(crawls) < 2:
+        return pd.DataFrame(columns=["url", "old_value", "new_value", "delta", "pct"])
+
+    prev, cur = load_crawl(crawls[-2]), load_crawl(crawls[-1])
+    df = prev[["url", "value"]].merge(
+        cur[["url", "value", "currency"]], on="url", how="outer",
+        suffixes=("_old", "_new"),
+    ).rename(columns={"value_old": "old_value", "value_new": "new_value"})
+
+    # NaN != NaN, so compare missing-ness separately
+    changed = (df["old_value"] != df["new_value"]) & ~(
+        df["old_value"].isna() & df["new_value"].isna()
+    )
+    df = df[changed].copy()
+    df["delta"] = df["new_value"] - df["old_value"]
+    df["pct"] = df["delta"] / df["old_value"] * 100
+    return df.reset_index(drop=True)
+
+
+# --------------------------------------------------------
+# Query: price spread of each Tomko SKU's matched competitors
+# --------------------------------------------------------
+def price_spread(match_results, tomko_prices=None, history_dir=HISTORY_DIR):
+    """
+    match_results: contents of data/tomko_to_nws_matches.json
+    tomko_prices:  optional {TomkoURL: price} (the Tomko scraper has no prices yet)
+    """
+    import pandas as pd
+
+    # a SKU listed twice keeps its first entry, as everywhere else
+    first = {}
+    for r in match_results:
+        first.setdefault(r["TomkoURL"], r)
+    pairs = pd.DataFrame(
+        [(r["TomkoURL"], rank, m["CompetitorURL"])
+         for r in first.values() for rank, m in enumerate(r["Matches"])],
+        columns=["TomkoURL", "rank", "url"],
+    )
+    crawls = list_crawls(history_dir)
+    if crawls:
+        latest = load_crawl(crawls[-1])[["url", "value"]]
+    else:
+        latest = pd.DataFrame(columns=["url", "value"])
+    pairs = pairs.merge(latest, on="url", how="left")
+
+    grouped = pairs.groupby("TomkoURL", sort=False)["value"]
+    out = pd.DataFrame({
+        "best_match_price": pairs[pairs["rank"] == 0].groupby("TomkoURL", sort=False)["value"].first(),
+        "min_price": grouped.min(),
+        "max_price": grouped.max(),
+        "mean_price": grouped.mean(),
+    })
+    out["spread"] = out["max_price"] - out["min_price"]
+
+    if tomko_prices:
+        out["tomko_price"] = pd.Series(tomko_prices, dtype=np.float64)
+        out["diff_vs_best_match"] = out["tomko_price"] - out["best_match_price"]
+
+    return out.reset_index().rename(columns={"index": "TomkoURL"})
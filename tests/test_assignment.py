@@ -0,0 +1,59 @@
+import numpy as np
+
+from assignment import (connected_blocks, graph_from_store, greedy_assignment,
+                        hungarian_assignment, mutual_best)
+from match_store import MatchStore
+
+
+def edges(*triples):
+    rows, cols, sims = zip(*triples)
+    return np.array(rows), np.array(cols), np.array(sims, dtype=np.float32)
+
+
+# SKU 0 likes competitor 0 most, but SKU 1 only has a good match there:
+#   greedy takes 0→0 (0.9) and leaves 1→1 (0.1), total 1.0
+#   Hungarian takes 0→1 (0.8) and 1→0 (0.85), total 1.65
+CROSSED = edges((0, 0, 0.9), (0, 1, 0.8), (1, 0, 0.85), (1, 1, 0.1))
+
+
+def pairs(out):
+    return {r: c for r, (c, _) in out.items()}
+
+
+def test_greedy_takes_best_edge_first():
+    assert pairs(greedy_assignment(*CROSSED)) == {0: 0, 1: 1}
+    assert pairs(greedy_assignment(*CROSSED, min_similarity=0.5)) == {0: 0}
+
+
+def test_hungarian_maximises_total_similarity():
+    out = hungarian_assignment(*CROSSED)
+    assert pairs(out) == {0: 1, 1: 0}
+    assert abs(sum(s for _, s in out.values()) - 1.65) < 1e-6
+
+
+def test_hungarian_prunes_then_solves_each_block():
+    # pruning 1→1 doesn't change the optimum; a separate block is solved on its own
+    rows, cols, sims = edges((0, 0, 0.9), (0, 1, 0.8), (1, 0, 0.85), (1, 1, 0.1), (2, 2, 0.7))
+    assert len(connected_blocks(rows, cols)) == 2
+    assert pairs(hungarian_assignment(rows, cols, sims, min_similarity=0.5)) == {0: 1, 1: 0, 2: 2}
+
+
+def test_hungarian_falls_back_to_greedy_for_oversized_blocks(capsys):
+    assert pairs(hungarian_assignment(*CROSSED, max_block=1)) == {0: 0, 1: 1}
+    assert "greedy" in capsys.readouterr().out
+
+
+def test_mutual_best_keeps_only_reciprocal_pairs():
+    # SKU 0's best is competitor 0, whose best SKU is 1 → no pair for SKU 0
+    rows, cols, sims = edges((0, 0, 0.9), (1, 0, 0.95), (2, 1, 0.6))
+    competitor_best = np.array([1, 2])
+    assert pairs(mutual_best(rows, cols, sims, competitor_best)) == {1: 0, 2: 1}
+
+
+def test_graph_from_store_limits_edges_and_uses_first_row_of_duplicates():
+    store = MatchStore(k=1, depth=3)
+    store.matches = {"a": [[0.9, "x"], [0.8, "y"], [0.2, "z"]]}
+    rows, cols, sims = graph_from_store(store, ["a", "a"], ["x", "y", "z", "x"], k=2)
+    assert rows.tolist() == [0, 0] and cols.tolist() == [0, 1]
+    rows, cols, _ = graph_from_store(store, ["a"], ["x", "y", "z"], min_similarity=0.5)
+    assert cols.tolist() == [0, 1]
@@ -0,0 +1,62 @@
+import json
+from types import SimpleNamespace
+
+import fetch_governor as fg
+
+
+class FakeEmbeddings:
+    """embeddings.create that fails for texts containing "bad"."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, model, input):
+        self.calls += 1
+        if any("bad" in t for t in input):
+            raise ValueError("rejected")
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t)), 1.0]) for t in input])
+
+
+def use_fakes(monkeypatch, tmp_path):
+    embeddings = FakeEmbeddings()
+    monkeypatch.setattr(fg, "_client", SimpleNamespace(embeddings=embeddings))
+    monkeypatch.setattr(fg, "governor", fg.FetchGovernor(ledger_file=str(tmp_path / "ledger.json")))
+    return embeddings
+
+
+def test_embed_cached_logs_failures_by_key_and_keeps_partial_results(monkeypatch, tmp_path):
+    embeddings = use_fakes(monkeypatch, tmp_path)
+    cache = str(tmp_path / "cache.npz")
+
+    vectors, failed = fg.embed_cached(["one", "bad two", "three"], ["u1", "u2", "u3"], "m", cache)
+    assert failed == ["u2"]
+    assert vectors[1] is None and vectors[0].tolist() == [3.0, 1.0]
+    assert fg.pending_keys(str(tmp_path / "ledger.json")) == ["u2"]
+    assert len(fg.load_embedding_cache(cache)) == 2
+
+    # rerun: cached texts are skipped, the fixed product clears its ledger entry
+    embeddings.calls = 0
+    vectors, failed = fg.embed_cached(["one", "two", "three"], ["u1", "u2", "u3"], "m", cache)
+    assert failed == [] and embeddings.calls == 1
+    assert fg.pending_keys(str(tmp_path / "ledger.json")) == []
+    with open(tmp_path / "ledger.json") as f:
+        assert json.load(f) == []
+
+
+def test_cache_and_ledger_saved_when_run_is_interrupted(monkeypatch, tmp_path):
+    use_fakes(monkeypatch, tmp_path)
+    cache = str(tmp_path / "cache.npz")
+    real = fg.embed_texts
+
+    def interrupt_on_third(texts, model, key=None):
+        if key == "u3":
+            raise KeyboardInterrupt
+        return real(texts, model, key=key)
+
+    monkeypatch.setattr(fg, "embed_texts", interrupt_on_third)
+    try:
+        fg.embed_cached(["one", "bad", "three"], ["u1", "u2", "u3"], "m", cache)
+    except KeyboardInterrupt:
+        pass
+    assert len(fg.load_embedding_cache(cache)) == 1
+    assert fg.pending_keys(str(tmp_path / "ledger.json")) == ["u2"]
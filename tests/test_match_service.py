@@ -0,0 +1,92 @@
+import http.client
+import json
+import threading
+
+import numpy as np
+import pytest
+
+import match_service as ms
+
+
+class FakeProvider:
+    """Embeds "fail" as an error, anything else as a fixed vector."""
+
+    def embed(self, texts):
+        if "fail" in texts:
+            raise RuntimeError("provider down")
+        return np.ones((len(texts), 2))
+
+
+def small_index(version=None):
+    tomko = [{"ProductURL": "t1", "ProductName": "Net"}]
+    nws = [{"url": "n1", "name": "Net", "price": "$10.00"}]
+    return ms.MatchIndex(tomko, np.array([[1.0, 0.0]]), nws, np.array([[1.0, 1.0]]), version)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(ms.MatchIndex, "load", classmethod(lambda cls: small_index()))
+    service = ms.MatchService(FakeProvider())
+    httpd = ms.MatchHTTPServer(("127.0.0.1", 0), ms.make_handler(service))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield service, httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def request(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request(method, path, body=body, headers=headers or {})
+    resp = conn.getresponse()
+    status, data = resp.status, json.loads(resp.read())
+    conn.close()
+    return status, data
+
+
+def test_bad_post_bodies_get_json_400(server):
+    _, port = server
+    assert request(port, "POST", "/match/text", b"[1]")[0] == 400
+    assert request(port, "POST", "/match/text", b"{")[0] == 400
+    assert request(port, "POST", "/match/text", b"{}", {"Content-Length": "abc"})[0] == 400
+    assert request(port, "POST", "/match/text", json.dumps({"text": 5}))[0] == 400
+
+
+def test_embedding_and_search_errors_are_reported_separately(server, monkeypatch):
+    service, port = server
+    status, body = request(port, "POST", "/match/text", json.dumps({"text": "fail"}))
+    assert status == 502 and body["error"].startswith("embedding failed")
+
+    def broken(queries):
+        raise IndexError("bad row")
+    monkeypatch.setattr(service.index, "search", broken)
+    status, body = request(port, "POST", "/match/text", json.dumps({"text": "net"}))
+    assert status == 500 and body["error"].startswith("search failed")
+
+    monkeypatch.delattr(service.index, "search")
+    status, body = request(port, "POST", "/match/text", json.dumps({"text": "net"}))
+    assert status == 200 and body["Matches"][0]["CompetitorURL"] == "n1"
+
+
+def test_mismatched_rows_rejected():
+    with pytest.raises(ValueError):
+        ms.MatchIndex([{"ProductURL": "a"}, {"ProductURL": "b"}], np.ones((1, 2)), [], np.empty((0, 2)))
+
+
+def test_watch_skips_a_version_that_failed_until_files_change(monkeypatch):
+    monkeypatch.setattr(ms.MatchIndex, "load", classmethod(lambda cls: small_index(("v1",))))
+    service = ms.MatchService(FakeProvider())
+    calls = []
+
+    def failing_load(cls):
+        calls.append(1)
+        raise ValueError("half-written")
+    monkeypatch.setattr(ms.MatchIndex, "load", classmethod(failing_load))
+
+    monkeypatch.setattr(ms, "files_version", lambda: ("v2",))
+    with pytest.raises(ValueError):
+        service.reload()
+    assert service.reload() is False and len(calls) == 1
+
+    monkeypatch.setattr(ms.MatchIndex, "load", classmethod(lambda cls: small_index(("v3",))))
+    monkeypatch.setattr(ms, "files_version", lambda: ("v3",))
+    assert service.reload() is True and service.index.version == ("v3",)
@@ -0,0 +1,81 @@
+import numpy as np
+
+from match_store import MatchStore
+
+
+DIM = 8
+
+
+def full_top(tomko_keys, tomko_vecs, nws_keys, nws_vecs, k, depth):
+    store = MatchStore(k=k, depth=depth)
+    store.update(tomko_keys, tomko_vecs, nws_keys, nws_vecs)
+    return {key: [n for _, n in store.top(key)] for key in tomko_keys}
+
+
+def assert_matches_full(store, tomko, nws):
+    t_keys, n_keys = list(tomko), list(nws)
+    t_vecs = np.array([tomko[key] for key in t_keys]).reshape(-1, DIM)
+    n_vecs = np.array([nws[key] for key in n_keys]).reshape(-1, DIM)
+    store.update(t_keys, t_vecs, n_keys, n_vecs)
+    expected = full_top(t_keys, t_vecs, n_keys, n_vecs, store.k, store.depth)
+    assert {key: [n for _, n in store.top(key)] for key in t_keys} == expected
+
+
+def test_evictions_below_k_fall_back_to_full_rescore():
+    rng = np.random.default_rng(0)
+    tomko = {"t0": rng.normal(size=DIM)}
+    nws = {f"n{i}": rng.normal(size=DIM) for i in range(30)}
+    store = MatchStore(k=3, depth=10)
+    assert_matches_full(store, tomko, nws)
+
+    # evict 6 of the stored candidates, then 3 more
+    for count in (6, 3):
+        for _, key in store.top("t0", count):
+            del nws[key]
+        assert_matches_full(store, tomko, nws)
+        assert len(store.top("t0")) == 3
+
+
+def test_incremental_equals_full_recompute():
+    rng = np.random.default_rng(1)
+    tomko = {f"t{i}": rng.normal(size=DIM) for i in range(20)}
+    nws = {f"n{i}": rng.normal(size=DIM) for i in range(40)}
+    store = MatchStore(k=3, depth=5)
+    assert_matches_full(store, tomko, nws)
+
+    next_id = 40
+    for _ in range(60):
+        op = rng.integers(6)
+        if op == 0:
+            tomko[f"t{next_id}"] = rng.normal(size=DIM)
+        elif op == 1 and len(tomko) > 1:
+            del tomko[rng.choice(list(tomko))]
+        elif op == 2:
+            tomko[rng.choice(list(tomko))] = rng.normal(size=DIM)
+        elif op == 3:
+            for _ in range(rng.integers(1, 4)):
+                nws[f"n{next_id}"] = rng.normal(size=DIM)
+                next_id += 1
+        elif op == 4 and len(nws) > 5:
+            for key in rng.choice(list(nws), size=rng.integers(1, 5), replace=False):
+                del nws[key]
+        else:
+            for key in rng.choice(list(nws), size=rng.integers(1, 4), replace=False):
+                nws[key] = rng.normal(size=DIM)
+        next_id += 1
+        assert_matches_full(store, tomko, nws)
+
+
+def test_cutoff_survives_save_and_load(tmp_path):
+    rng = np.random.default_rng(2)
+    tomko = {f"t{i}": rng.normal(size=DIM) for i in range(5)}
+    nws = {f"n{i}": rng.normal(size=DIM) for i in range(30)}
+    path = str(tmp_path / "store.json")
+
+    store = MatchStore(k=3, depth=4)
+    assert_matches_full(store, tomko, nws)
+    store.save(path)
+
+    for key in list(nws)[:20]:
+        del nws[key]
+    assert_matches_full(MatchStore.load(path, k=3, depth=4), tomko, nws)
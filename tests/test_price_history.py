@@ -0,0 +1,23 @@
+import price_history as ph
+
+
+def test_crawls_in_the_same_second_get_separate_partitions(tmp_path):
+    d = str(tmp_path)
+    ph.append_crawl([{"url": "a", "price": "$5.00"}], crawl_ts=100, history_dir=d)
+    ph.append_crawl([{"url": "a", "price": "$6.00"}], crawl_ts=100, history_dir=d)
+    assert len(ph.list_crawls(d)) == 2
+    changes = ph.price_changes(d)
+    assert changes[["old_value", "new_value"]].values.tolist() == [[5.0, 6.0]]
+
+
+def test_price_spread_keeps_first_entry_of_a_duplicate_sku(tmp_path):
+    d = str(tmp_path)
+    ph.append_crawl([{"url": "a", "price": "$5.00"}, {"url": "b", "price": "$9.00"}],
+                    crawl_ts=100, history_dir=d)
+    results = [
+        {"TomkoURL": "t", "Matches": [{"CompetitorURL": "a"}, {"CompetitorURL": "b"}]},
+        {"TomkoURL": "t", "Matches": [{"CompetitorURL": "b"}]},
+    ]
+    out = ph.price_spread(results, history_dir=d).set_index("TomkoURL")
+    assert out.loc["t", "best_match_price"] == 5.0
+    assert out.loc["t", "spread"] == 4.0
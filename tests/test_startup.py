@@ -0,0 +1,18 @@
+import math
+
+import pytest
+
+import cli
+
+
+# best of a few runs, so a cold disk cache doesn't fail the test
+RUNS = 3
+
+
+@pytest.mark.parametrize("module, budget", [("cli", cli.STARTUP_BUDGET_MS)]
+                         + [(m, cli.MODULE_BUDGET_MS) for m in cli.PIPELINE_MODULES])
+def test_import_within_budget(module, budget):
+    ms, heavy = min(cli.probe_import(module) for _ in range(RUNS))
+    assert math.isfinite(ms), f"import {module} failed: {heavy}"
+    assert heavy == [], f"import {module} loads {', '.join(heavy)}"
+    assert ms <= budget, f"import {module} took {ms:.1f} ms (budget {budget} ms)"
@@ -3,25 +3,27 @@ import os
 import io
 import re
 import json
-import pandas as pd
 from urllib.parse import urlparse
-from playwright.async_api import async_playwright
-import requests
-from PIL import Image as PILImage
-from openpyxl import Workbook
+
+from fetch_governor import governor, MAX_CONCURRENCY
+
+# playwright, pandas, PIL, openpyxl and requests are imported inside the
+# functions that use them, so importing this module stays cheap
 
 
 # --------------------------------------------------------
 # Ensure folder structure exists
 # --------------------------------------------------------
-os.makedirs("data", exist_ok=True)
-os.makedirs("images", exist_ok=True)
+def ensure_dirs():
+    os.makedirs("data", exist_ok=True)
+    os.makedirs("images", exist_ok=True)
 
 
 # --------------------------------------------------------
 # Helper: Convert all images to PNG
 # --------------------------------------------------------
 def convert_to_png(image_bytes):
+    from PIL import Image as PILImage
     try:
         img = PILImage.open(io.BytesIO(image_bytes))
         img = img.convert("RGB")
@@ -61,26 +63,64 @@ def extract_model_codes(text):
 # --------------------------------------------------------
 # Download image and convert to PNG
 # --------------------------------------------------------
-def download_image_as_png(url, idx):
+def download_image_as_png(url, image_index):
+    import requests
+    from image_index import content_path, image_hashes
+
+    # same image URL already on disk → skip the download
+    existing = image_index.path_for_url(url)
+    if existing and os.path.exists(existing):
+        return existing
+
     try:
-        r = requests.get(url, timeout=15)
-        if r.status_code != 200:
-            return ""
-        png_bytes = convert_to_png(r.content)
-        outpath = f"images/product_{idx}.png"
-        with open(outpath, "wb") as f:
-            f.write(png_bytes)
-        return outpath
-    except:
+        r = governor.call(url, requests.get, url, timeout=15)
+    except Exception:
+        # already retried and written to the failure ledger
         return ""
+    if r.status_code != 200:
+        return ""
+    png_bytes = convert_to_png(r.content)
+
+    # identical/near-identical picture under another URL → reuse that file
+    try:
+        hashes = image_hashes([png_bytes])[0]
+    except Exception:
+        hashes = None
+    if hashes is not None:
+        dup = image_index.find_duplicate(hashes)
+        if dup is not None:
+            outpath = image_index.paths[dup]
+            image_index.add(url, outpath, hashes)
+            return outpath
+
+    # named by content, so the file can't later be overwritten by another product
+    outpath = content_path(png_bytes)
+    with open(outpath, "wb") as f:
+        f.write(png_bytes)
+    if hashes is not None:
+        image_index.add(url, outpath, hashes)
+    return outpath
 
 
 # --------------------------------------------------------
 # Scrape individual product page
 # --------------------------------------------------------
-async def scrape_product(browser, url, idx):
-    page = await browser.new_page()
-    await page.goto(url, timeout=60000)
+async def scrape_product(browser, url, image_index, tabs):
+    # hold a tab slot before opening the page, so a listing page's links
+    # don't all open at once while the governor only lets a few through
+    async with tabs:
+        page = await browser.new_page()
+        try:
+            return await _scrape_product_page(page, url, image_index)
+        except Exception as e:
+            print(f"   ✗ Failed {url}: {type(e).__name__}")
+            return None
+        finally:
+            await page.close()
+
+
+async def _scrape_product_page(page, url, image_index):
+    await governor.acall(url, page.goto, url, timeout=60000)
 
     title = ""
     if await page.query_selector("h1.product_title"):
@@ -100,9 +140,8 @@ async def scrape_product(browser, url, idx):
     img_el = await page.query_selector("img.wp-post-image")
     if img_el:
         img_url = await img_el.get_attribute("src")
-        img_path = download_image_as_png(img_url, idx)
-
-    await page.close()
+        # requests is blocking; keep the event loop free for other pages
+        img_path = await asyncio.to_thread(download_image_as_png, img_url, image_index)
 
     return {
         "ProductURL": url,
@@ -120,7 +159,11 @@ async def scrape_product(browser, url, idx):
 # Scrape list page
 # --------------------------------------------------------
 async def scrape_list_page(page, url):
-    await page.goto(url, timeout=60000)
+    try:
+        await governor.acall(url, page.goto, url, timeout=60000)
+    except Exception as e:
+        print(f"   ✗ Failed {url}: {type(e).__name__}")
+        return None
     links = await page.eval_on_selector_all(
         "li.product a.woocommerce-LoopProduct-link",
         "els => els.map(e => e.href)"
@@ -132,6 +175,8 @@ async def scrape_list_page(page, url):
 # Save all formats
 # --------------------------------------------------------
 def save_outputs(df):
+    from openpyxl import Workbook
+
     df.to_csv("data/tomko_products.csv", index=False)
     df.to_json("data/tomko_products.json", orient="records", indent=2)
 
@@ -152,8 +197,16 @@ def save_outputs(df):
 # Main
 # --------------------------------------------------------
 async def main():
+    from playwright.async_api import async_playwright
+    import pandas as pd
+    from image_index import ImageIndex
+
+    ensure_dirs()
     MAX_PAGES = 30
     all_products = []
+    image_index = ImageIndex.load()
+    # never more open product tabs than the governor could let through
+    tabs = asyncio.Semaphore(MAX_CONCURRENCY)
 
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
@@ -165,18 +218,28 @@ async def main():
             print(f"Scraping {url}...")
 
             links = await scrape_list_page(page, url)
+            if links is None:
+                # listing page failed after retries; it is in the ledger
+                continue
             if not links:
                 print("Reached final page.")
                 break
 
+            # pages are fetched concurrently; the governor decides how many
+            # actually hit the host at once
+            tasks = []
             for link in links:
                 print(f" → Product {idx}: {link}")
-                data = await scrape_product(browser, link, idx)
-                all_products.append(data)
+                tasks.append(scrape_product(browser, link, image_index, tabs))
                 idx += 1
+            results = await asyncio.gather(*tasks)
+            all_products.extend(r for r in results if r)
 
         await browser.close()
 
+    governor.save_ledger()
+    image_index.save()
+
     df = pd.DataFrame(all_products)
     save_outputs(df)
 